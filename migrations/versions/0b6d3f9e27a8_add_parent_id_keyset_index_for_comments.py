@@ -0,0 +1,30 @@
+"""add (parent_id, created, id) index for comments
+
+Revision ID: 0b6d3f9e27a8
+Revises: f2c4e8a61b37
+Create Date: 2026-10-18 14:05:12.884301
+
+"""
+from collections.abc import Sequence
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0b6d3f9e27a8"
+down_revision: str | None = "f2c4e8a61b37"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "comments_parent_id_created_id_idx",
+        "comments",
+        ["parent_id", "created", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("comments_parent_id_created_id_idx", table_name="comments")
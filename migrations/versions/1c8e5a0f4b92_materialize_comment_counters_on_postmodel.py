@@ -0,0 +1,60 @@
+"""materialize comment counters on PostModel
+
+Revision ID: 1c8e5a0f4b92
+Revises: 0b6d3f9e27a8
+Create Date: 2026-10-18 14:51:36.120487
+
+"""
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "1c8e5a0f4b92"
+down_revision: str | None = "0b6d3f9e27a8"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "posts",
+        sa.Column(
+            "all_comments_count",
+            sa.Integer(),
+            server_default="0",
+            nullable=False,
+        ),
+    )
+    op.add_column(
+        "posts",
+        sa.Column(
+            "base_comments_count",
+            sa.Integer(),
+            server_default="0",
+            nullable=False,
+        ),
+    )
+    # backfill the counters, `just recount-comments` repairs them later on
+    op.execute(
+        """
+        update posts as p
+        set all_comments_count = counts.all_comments_count,
+            base_comments_count = counts.base_comments_count
+        from (
+          select post_id,
+                 count(*) as all_comments_count,
+                 count(*) filter (where parent_id is null) as base_comments_count
+          from comments
+          group by post_id
+        ) as counts
+        where p.id = counts.post_id
+        """,
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("posts", "base_comments_count")
+    op.drop_column("posts", "all_comments_count")
@@ -0,0 +1,39 @@
+"""add keyset pagination indexes for posts and drafts
+
+Revision ID: 2a7e9c4d1f63
+Revises: 1c8e5a0f4b92
+Create Date: 2026-10-18 16:21:40.517203
+
+"""
+from collections.abc import Sequence
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "2a7e9c4d1f63"
+down_revision: str | None = "1c8e5a0f4b92"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    for table in ("posts", "drafts"):
+        op.create_index(
+            f"{table}_username_created_id_idx",
+            table,
+            ["username", "created", "id"],
+            unique=False,
+        )
+        op.create_index(
+            f"{table}_username_title_id_idx",
+            table,
+            ["username", "title", "id"],
+            unique=False,
+        )
+
+
+def downgrade() -> None:
+    for table in ("posts", "drafts"):
+        op.drop_index(f"{table}_username_title_id_idx", table_name=table)
+        op.drop_index(f"{table}_username_created_id_idx", table_name=table)
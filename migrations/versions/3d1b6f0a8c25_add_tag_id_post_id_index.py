@@ -0,0 +1,33 @@
+"""add (tag_id, post_id) index for association_table
+
+Revision ID: 3d1b6f0a8c25
+Revises: 2a7e9c4d1f63
+Create Date: 2026-10-18 17:02:18.391846
+
+"""
+from collections.abc import Sequence
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3d1b6f0a8c25"
+down_revision: str | None = "2a7e9c4d1f63"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "association_table_tag_id_post_id_idx",
+        "association_table",
+        ["tag_id", "post_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "association_table_tag_id_post_id_idx",
+        table_name="association_table",
+    )
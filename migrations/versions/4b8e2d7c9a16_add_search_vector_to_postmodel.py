@@ -0,0 +1,47 @@
+"""add a generated search vector with a gin index to posts
+
+Revision ID: 4b8e2d7c9a16
+Revises: 3d1b6f0a8c25
+Create Date: 2026-10-18 17:48:05.702914
+
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "4b8e2d7c9a16"
+down_revision: str | None = "3d1b6f0a8c25"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    # a stored generated column is computed for the existing rows right here
+    op.add_column(
+        "posts",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                "setweight(to_tsvector('english', title), 'A') || "
+                "setweight(to_tsvector('english', body), 'B')",
+                persisted=True,
+            ),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        "posts_search_vector_idx",
+        "posts",
+        ["search_vector"],
+        unique=False,
+        postgresql_using="gin",
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("posts_search_vector_idx", table_name="posts")
+    op.drop_column("posts", "search_vector")
@@ -0,0 +1,25 @@
+"""add a unique index on posts.url
+
+Revision ID: 5e0c3a9b7d41
+Revises: 4b8e2d7c9a16
+Create Date: 2026-10-18 18:30:51.124067
+
+"""
+from collections.abc import Sequence
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5e0c3a9b7d41"
+down_revision: str | None = "4b8e2d7c9a16"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_index("posts_url_idx", "posts", ["url"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index("posts_url_idx", table_name="posts")
@@ -0,0 +1,26 @@
+"""add comments_updated to posts
+
+Revision ID: 6f2d8b1e4c70
+Revises: 5e0c3a9b7d41
+Create Date: 2026-10-18 19:12:37.630548
+
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "6f2d8b1e4c70"
+down_revision: str | None = "5e0c3a9b7d41"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column("posts", sa.Column("comments_updated", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("posts", "comments_updated")
@@ -0,0 +1,39 @@
+"""add generated excerpts to posts and drafts
+
+Revision ID: 7a3c9e1d5b28
+Revises: 6f2d8b1e4c70
+Create Date: 2026-10-18 21:05:44.318207
+
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "7a3c9e1d5b28"
+down_revision: str | None = "6f2d8b1e4c70"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+EXCERPT = r"left(regexp_replace(body, '\s+', ' ', 'g'), 280)"
+
+
+def upgrade() -> None:
+    # the excerpts of the existing rows are computed right here
+    for table in ("posts", "drafts"):
+        op.add_column(
+            table,
+            sa.Column(
+                "excerpt",
+                sa.String(),
+                sa.Computed(EXCERPT, persisted=True),
+                nullable=True,
+            ),
+        )
+
+
+def downgrade() -> None:
+    for table in ("drafts", "posts"):
+        op.drop_column(table, "excerpt")
@@ -0,0 +1,32 @@
+"""add (post_id, created, id) index of base comments
+
+Revision ID: 8c1f4a7d2e39
+Revises: 7a3c9e1d5b28
+Create Date: 2026-10-18 22:41:09.517326
+
+"""
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8c1f4a7d2e39"
+down_revision: str | None = "7a3c9e1d5b28"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "comments_post_id_created_id_base_idx",
+        "comments",
+        ["post_id", "created", "id"],
+        unique=False,
+        postgresql_where=sa.text("parent_id IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("comments_post_id_created_id_base_idx", table_name="comments")
@@ -0,0 +1,32 @@
+"""drop the unused (post_id, path) index of comments
+
+Revision ID: 9d4e2b6a1c58
+Revises: 8c1f4a7d2e39
+Create Date: 2026-10-18 23:12:37.604118
+
+"""
+from collections.abc import Sequence
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9d4e2b6a1c58"
+down_revision: str | None = "8c1f4a7d2e39"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    # comments are streamed in the numeric order of their path labels, which
+    # the text order of `path` in this index does not match
+    op.drop_index("comments_post_id_path_idx", table_name="comments")
+
+
+def downgrade() -> None:
+    op.create_index(
+        "comments_post_id_path_idx",
+        "comments",
+        ["post_id", "path"],
+        unique=False,
+    )
@@ -0,0 +1,46 @@
+"""materialize reply counters on CommentModel
+
+Revision ID: c3d9a1e5b7f2
+Revises: 4724aa1400c5
+Create Date: 2026-10-18 10:12:31.402118
+
+"""
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c3d9a1e5b7f2"
+down_revision: str | None = "4724aa1400c5"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "comments",
+        sa.Column("reply_count", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.add_column(
+        "comments",
+        sa.Column("children_count", sa.Integer(), server_default="0", nullable=False),
+    )
+    # backfill the counters of the existing comments
+    op.execute(
+        """
+        update comments as c
+        set reply_count = (
+              select count(*) - 1 from comments where path <@ c.path
+            ),
+            children_count = (
+              select count(*) from comments where parent_id = c.id
+            )
+        """,
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("comments", "children_count")
+    op.drop_column("comments", "reply_count")
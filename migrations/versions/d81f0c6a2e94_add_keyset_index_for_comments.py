@@ -0,0 +1,30 @@
+"""add keyset index for comments
+
+Revision ID: d81f0c6a2e94
+Revises: c3d9a1e5b7f2
+Create Date: 2026-10-18 11:02:47.918305
+
+"""
+from collections.abc import Sequence
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d81f0c6a2e94"
+down_revision: str | None = "c3d9a1e5b7f2"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "comments_post_id_created_id_idx",
+        "comments",
+        ["post_id", "created", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("comments_post_id_created_id_idx", table_name="comments")
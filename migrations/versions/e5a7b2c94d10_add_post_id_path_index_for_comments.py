@@ -0,0 +1,32 @@
+"""add (post_id, path) index for comments
+
+Revision ID: e5a7b2c94d10
+Revises: d81f0c6a2e94
+Create Date: 2026-10-18 11:48:05.227690
+
+"""
+from collections.abc import Sequence
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e5a7b2c94d10"
+down_revision: str | None = "d81f0c6a2e94"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    # `post_id` leads both this index and `comments_post_id_created_id_idx`,
+    # so lookups on `comments.post_id` alone need no index of their own
+    op.create_index(
+        "comments_post_id_path_idx",
+        "comments",
+        ["post_id", "path"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("comments_post_id_path_idx", table_name="comments")
@@ -0,0 +1,57 @@
+"""cascade comment deletes in the database
+
+Revision ID: f2c4e8a61b37
+Revises: e5a7b2c94d10
+Create Date: 2026-10-18 13:20:41.603918
+
+"""
+from collections.abc import Sequence
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f2c4e8a61b37"
+down_revision: str | None = "e5a7b2c94d10"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.drop_constraint("comments_post_id_fkey", "comments", type_="foreignkey")
+    op.drop_constraint("comments_parent_id_fkey", "comments", type_="foreignkey")
+    op.create_foreign_key(
+        "comments_post_id_fkey",
+        "comments",
+        "posts",
+        ["post_id"],
+        ["id"],
+        ondelete="CASCADE",
+    )
+    op.create_foreign_key(
+        "comments_parent_id_fkey",
+        "comments",
+        "comments",
+        ["parent_id"],
+        ["id"],
+        ondelete="CASCADE",
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint("comments_parent_id_fkey", "comments", type_="foreignkey")
+    op.drop_constraint("comments_post_id_fkey", "comments", type_="foreignkey")
+    op.create_foreign_key(
+        "comments_parent_id_fkey",
+        "comments",
+        "comments",
+        ["parent_id"],
+        ["id"],
+    )
+    op.create_foreign_key(
+        "comments_post_id_fkey",
+        "comments",
+        "posts",
+        ["post_id"],
+        ["id"],
+    )
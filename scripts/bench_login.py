@@ -0,0 +1,100 @@
+"""Measure how a burst of logins slows down the other requests of a server
+
+A client polls a cheap endpoint while nothing else runs, and then while a
+burst of concurrent logins is in flight, and the latency percentiles of the
+polls are printed for both phases. Password hashing which blocks the event
+loop shows up as the polls stalling during the burst.
+
+Run a single worker against a database of its own, with the metrics served
+and the login limits raised so that the burst is not refused:
+
+    EXPOSE_METRICS=true LOGIN_IP_BURST=1000 uvicorn src.web.app:app --port 8765
+    python scripts/bench_login.py --url http://127.0.0.1:8765
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+
+import httpx
+
+
+def percentile(latencies, p):
+    """Return the `p`th percentile of the sorted `latencies` by nearest rank"""
+    rank = max(1, round(p / 100 * len(latencies)))
+    return latencies[rank - 1]
+
+
+async def probe(client, url, latencies, stop, interval):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get(url)
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(interval)
+
+
+async def phase(client, args, login):
+    """Poll while `login` runs, return the sorted latencies and its result"""
+    latencies, stop = [], asyncio.Event()
+    async with httpx.AsyncClient(timeout=args.timeout) as probe_client:
+        task = asyncio.create_task(
+            probe(
+                probe_client,
+                args.url + args.probe_path,
+                latencies,
+                stop,
+                args.interval,
+            ),
+        )
+        start = time.perf_counter()
+        result = await login(client)
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await task
+    return sorted(latencies), elapsed, result
+
+
+async def main(args):
+    credentials = {"username": args.username, "password": args.password}
+    async with httpx.AsyncClient(timeout=args.timeout) as client:
+        # the user may be there from an earlier run
+        await client.post(args.url + "/users/signup", json=credentials)
+
+        async def idle(_):
+            await asyncio.sleep(args.idle)
+            return Counter()
+
+        async def burst(client):
+            responses = await asyncio.gather(
+                *(
+                    client.post(
+                        args.url + "/auth/access-token",
+                        data={**credentials, "grant_type": "password"},
+                    )
+                    for _ in range(args.logins)
+                ),
+            )
+            return Counter(response.status_code for response in responses)
+
+        for name, login in (("idle", idle), ("burst", burst)):
+            latencies, elapsed, statuses = await phase(client, args, login)
+            print(
+                f"{name:5}: {len(latencies)} polls in {elapsed:.2f}s, "
+                f"p50 {percentile(latencies, 50):.1f} ms, "
+                f"p99 {percentile(latencies, 99):.1f} ms, "
+                f"max {latencies[-1]:.1f} ms",
+                f"statuses {dict(statuses)}" if statuses else "",
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--probe-path", default="/metrics/caches")
+    parser.add_argument("--interval", type=float, default=0.005)
+    parser.add_argument("--idle", type=float, default=2, help="seconds")
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--username", default="bench")
+    parser.add_argument("--password", default="bench-password")
+    parser.add_argument("--timeout", type=float, default=60)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,149 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Protocol
+
+MISSING = object()
+
+
+class CacheBackend(Protocol):
+    def get(self, key, default=MISSING):
+        ...
+
+    def set(self, key, value, *, tag=None, ttl=None, since=None):
+        ...
+
+    def delete(self, key):
+        ...
+
+    def generation(self) -> int:
+        ...
+
+    def invalidate(self, tag):
+        ...
+
+    def clear(self):
+        ...
+
+    def stats(self) -> dict:
+        ...
+
+
+class LRUCache:
+    """An in-process cache which evicts the least recently used entry
+
+    Every entry expires `ttl` seconds after it is set. Entries can be
+    tagged, so that all the entries of a tag are dropped at once with
+    `invalidate`.
+
+    A value read from the database may be set after an invalidation of its
+    tag which the read did not see. So `generation()` is taken before the
+    read and passed to `set` as `since`, which drops the value if its tag
+    has been invalidated since. The tag need not be known before the read.
+    The last invalidation of at most `maxsize` tags is remembered, a tag
+    which is forgotten counts as invalidated when it was forgotten.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60.0, timer=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (expires_at, tag, value)
+        self._tags = {}  # tag -> keys
+        self._invalidations = 0
+        # tag -> the count of invalidations when the tag was last invalidated
+        self._invalidated_at = OrderedDict()
+        self._floor = 0  # when the forgotten tags count as invalidated
+
+    def get(self, key, default=MISSING):
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] <= self.timer():
+            self._pop(key)
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[2]
+
+    def set(self, key, value, *, tag=None, ttl=None, since=None):
+        if since is not None and self._invalidated_at.get(tag, self._floor) > since:
+            return
+        self._pop(key)
+        expires_at = self.timer() + (self.ttl if ttl is None else ttl)
+        self._entries[key] = (expires_at, tag, value)
+        if tag is not None:
+            self._tags.setdefault(tag, set()).add(key)
+
+        while len(self._entries) > self.maxsize:
+            self._pop(next(iter(self._entries)))
+
+    def delete(self, key):
+        self._pop(key)
+
+    def generation(self) -> int:
+        """Return the count of invalidations so far"""
+        return self._invalidations
+
+    def invalidate(self, tag):
+        for key in self._tags.pop(tag, ()):
+            self._entries.pop(key, None)
+
+        self._invalidations += 1
+        self._invalidated_at.pop(tag, None)
+        self._invalidated_at[tag] = self._invalidations
+        while len(self._invalidated_at) > self.maxsize:
+            self._invalidated_at.popitem(last=False)
+            self._floor = self._invalidations
+
+    def clear(self):
+        self._entries.clear()
+        self._tags.clear()
+        self._invalidated_at.clear()
+        self._invalidations += 1
+        self._floor = self._invalidations
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None or entry[1] is None:
+            return
+
+        keys = self._tags[entry[1]]
+        keys.discard(key)
+        if not keys:
+            del self._tags[entry[1]]
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into a single call
+
+    The first caller of a key runs the call, the ones arriving while it is
+    in flight await its result (or its exception) instead of running it
+    again, e.g. so that an expired cache entry is refilled once.
+    """
+
+    def __init__(self):
+        self._flights = {}
+
+    async def do(self, key, fn):
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = asyncio.ensure_future(fn())
+            self._flights[key] = flight
+            flight.add_done_callback(lambda _: self._flights.pop(key, None))
+        # a cancelled caller must not cancel the call the others wait for
+        return await asyncio.shield(flight)
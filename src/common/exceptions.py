@@ -26,6 +26,23 @@ class DuplicateUsernameError(Exception):
     pass
 
 
+class PasswordHasherBusyError(Exception):
+    pass
+
+
+class TooManyRequestsError(Exception):
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+
+
+class InvalidCursorError(Exception):
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def __str__(self):
+        return f"cursor: {self.cursor!r} is not valid!"
+
+
 class UnAuthorizedError(Exception):
     pass
 
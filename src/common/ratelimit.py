@@ -0,0 +1,70 @@
+import time
+from collections import OrderedDict
+from typing import Protocol
+
+
+class RateLimitBackend(Protocol):
+    async def take(self, key) -> float:
+        ...
+
+    async def peek(self, key) -> float:
+        ...
+
+    def clear(self):
+        ...
+
+
+class MemoryRateLimitBackend:
+    """Token buckets kept in process memory
+
+    Every key has a bucket of `burst` tokens, refilled at `rate` tokens a
+    second, and a request takes one token of it. `take` returns 0 when the
+    request may go on, otherwise the seconds until a token is refilled.
+    `peek` returns the same without taking the token.
+
+    A bucket idle long enough to be full again is the same as no bucket,
+    so such buckets are swept away as requests come in, and at most
+    `maxsize` buckets are kept by dropping the least recently used ones.
+    """
+
+    def __init__(self, rate, burst, maxsize=100_000, timer=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.maxsize = maxsize
+        self.timer = timer
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+
+    async def take(self, key) -> float:
+        now = self.timer()
+        self._sweep(now)
+
+        tokens = self._tokens(key, now)
+        self._buckets.pop(key, None)
+        if tokens >= 1:
+            tokens, wait = tokens - 1, 0.0
+        else:
+            wait = (1 - tokens) / self.rate
+        self._buckets[key] = (tokens, now)
+
+        while len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+        return wait
+
+    async def peek(self, key) -> float:
+        tokens = self._tokens(key, self.timer())
+        return 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+
+    def clear(self):
+        self._buckets.clear()
+
+    def _tokens(self, key, now):
+        tokens, updated_at = self._buckets.get(key, (self.burst, now))
+        return min(self.burst, tokens + (now - updated_at) * self.rate)
+
+    def _sweep(self, now):
+        # the buckets are in the order of their last use, the idle ones first
+        while self._buckets:
+            key, (tokens, updated_at) = next(iter(self._buckets.items()))
+            if tokens + (now - updated_at) * self.rate < self.burst:
+                break
+            del self._buckets[key]
@@ -1,6 +1,43 @@
-import hashlib
+import base64
+import binascii
+import json
+import secrets
 from datetime import datetime
 
+from src.common.exceptions import InvalidCursorError
+
 
 def generate_hash():
-    return hashlib.shake_256(str(datetime.utcnow()).encode("utf-8")).hexdigest(4)
+    """Return a random suffix which tells apart the urls of the same title
+
+    `posts.url` is unique, so the suffix is random rather than derived from
+    the clock, which two requests in the same microsecond would share.
+    """
+    return secrets.token_hex(4)
+
+
+def encode_cursor(*values) -> str:
+    """Pack the sort key of the last row of a page into an opaque cursor"""
+    values = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str, *types) -> tuple:
+    """Unpack a cursor made by `encode_cursor` into values of `types`"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return tuple(
+            datetime.fromisoformat(value) if type_ is datetime else type_(value)
+            for type_, value in zip(types, values, strict=True)
+        )
+    except (binascii.Error, ValueError, TypeError, UnicodeError):
+        raise InvalidCursorError(cursor)
+
+
+def next_page(rows: list, limit: int, key) -> tuple[list, str | None]:
+    """Drop the extra row fetched past `limit` and return the cursor of the
+    next page, made of the `key` of the last row kept"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(*key(rows[-1]))
@@ -0,0 +1,22 @@
+import asyncio
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.repository.repos.post_repo import PostRepo
+from src.repository.unit_of_work import UnitOfWork
+from src.web.core.database import sqlalchemy_engine
+
+
+async def recount_post_comments(batch_size=1000):
+    """Repair the comment counters of all the posts, one batch per transaction"""
+    asessionmaker = async_sessionmaker(sqlalchemy_engine, expire_on_commit=False)
+    last_id = 0
+    while last_id is not None:
+        async with UnitOfWork(asessionmaker()) as uow:
+            repo = PostRepo(uow.session)
+            last_id = await repo.recount_comments(last_id, batch_size)
+            await uow.commit()
+
+
+if __name__ == "__main__":
+    asyncio.run(recount_post_comments())
@@ -1,10 +1,23 @@
 from datetime import datetime
 
-from sqlalchemy import ForeignKey, BigInteger, Integer, Table, Column, String, Index
+from sqlalchemy import (
+    ForeignKey,
+    BigInteger,
+    Integer,
+    Table,
+    Column,
+    String,
+    Index,
+    Computed,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.ext.asyncio import AsyncAttrs
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 from sqlalchemy_utils import LtreeType
 
+# the teaser shown by list views: the start of the body on a single line
+EXCERPT = r"left(regexp_replace(body, '\s+', ' ', 'g'), 280)"
+
 
 class Base(AsyncAttrs, DeclarativeBase):
     id: Mapped[int] = mapped_column(
@@ -31,12 +44,31 @@ association_table = Table(
 
 class PostModel(Base):
     __tablename__ = "posts"
+    # read the excerpt back with RETURNING when the body changes
+    __mapper_args__ = {"eager_defaults": True}
 
     title: Mapped[str]
     body: Mapped[str]
     url: Mapped[str]
     username: Mapped[str] = mapped_column(ForeignKey("users.username"))
     updated: Mapped[datetime | None]
+    # maintained by postgres on every insert and update of the body
+    excerpt: Mapped[str] = mapped_column(Computed(EXCERPT, persisted=True))
+    # materialized counters, kept up to date by `CommentRepo.add/delete`
+    all_comments_count: Mapped[int] = mapped_column(default=0, server_default="0")
+    base_comments_count: Mapped[int] = mapped_column(default=0, server_default="0")
+    # when a comment of the post was last added, edited or deleted
+    comments_updated: Mapped[datetime | None]
+    # maintained by postgres, the title weighs more than the body in ranking
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(
+            "setweight(to_tsvector('english', title), 'A') || "
+            "setweight(to_tsvector('english', body), 'B')",
+            persisted=True,
+        ),
+        deferred=True,
+    )
 
     user: Mapped["UserModel"] = relationship(back_populates="posts")
     tags: Mapped[set["TagModel"]] = relationship(
@@ -46,6 +78,7 @@ class PostModel(Base):
     comments: Mapped[list["CommentModel"]] = relationship(
         back_populates="post",
         cascade="delete, delete-orphan",
+        passive_deletes=True,
     )
 
     def __repr__(self):
@@ -64,6 +97,7 @@ class PostModel(Base):
             "updated": self.updated,
             "title": self.title,
             "body": self.body,
+            "excerpt": self.excerpt,
             "url": self.url,
             "username": self.username,
             "tags": sorted(tag.name for tag in self.tags),
@@ -125,11 +159,15 @@ class UserModel(Base):
 
 class DraftModel(Base):
     __tablename__ = "drafts"
+    # read the excerpt back with RETURNING when the body changes
+    __mapper_args__ = {"eager_defaults": True}
 
     title: Mapped[str]
     body: Mapped[str]
     username: Mapped[str] = mapped_column(ForeignKey("users.username"))
     updated: Mapped[datetime | None]
+    # maintained by postgres on every insert and update of the body
+    excerpt: Mapped[str] = mapped_column(Computed(EXCERPT, persisted=True))
 
     user: Mapped["UserModel"] = relationship(back_populates="drafts")
 
@@ -143,21 +181,28 @@ class DraftModel(Base):
             "updated": self.updated,
             "title": self.title,
             "body": self.body,
+            "excerpt": self.excerpt,
         }
 
 
 class CommentModel(Base):
     __tablename__ = "comments"
-    post_id: Mapped[int] = mapped_column(ForeignKey("posts.id"))
-    parent_id: Mapped[int | None] = mapped_column(ForeignKey("comments.id"))
+    post_id: Mapped[int] = mapped_column(ForeignKey("posts.id", ondelete="CASCADE"))
+    parent_id: Mapped[int | None] = mapped_column(
+        ForeignKey("comments.id", ondelete="CASCADE"),
+    )
     comment: Mapped[str] = mapped_column(String(255))
     username: Mapped[str] = mapped_column(ForeignKey("users.username"))
     path: Mapped[str | None] = mapped_column(LtreeType)
     updated: Mapped[datetime | None]
+    # materialized counters, kept up to date by `CommentRepo.add/delete`
+    reply_count: Mapped[int] = mapped_column(default=0, server_default="0")
+    children_count: Mapped[int] = mapped_column(default=0, server_default="0")
 
     post: Mapped["PostModel"] = relationship(back_populates="comments")
     children: Mapped[list["CommentModel"]] = relationship(
         cascade="delete, delete-orphan",
+        passive_deletes=True,
     )
 
     def sync_dict(self):
@@ -170,7 +215,63 @@ class CommentModel(Base):
             "comment": self.comment,
             "path": self.path.path,
             "username": self.username,
+            "reply_count": self.reply_count,
+            "children_count": self.children_count,
         }
 
 
 index = Index("path_gist_idx", CommentModel.path, postgresql_using="gist")
+post_created_index = Index(
+    "comments_post_id_created_id_idx",
+    CommentModel.post_id,
+    CommentModel.created,
+    CommentModel.id,
+)
+base_created_index = Index(
+    "comments_post_id_created_id_base_idx",
+    CommentModel.post_id,
+    CommentModel.created,
+    CommentModel.id,
+    postgresql_where=CommentModel.parent_id.is_(None),
+)
+parent_created_index = Index(
+    "comments_parent_id_created_id_idx",
+    CommentModel.parent_id,
+    CommentModel.created,
+    CommentModel.id,
+)
+posts_username_created_index = Index(
+    "posts_username_created_id_idx",
+    PostModel.username,
+    PostModel.created,
+    PostModel.id,
+)
+posts_username_title_index = Index(
+    "posts_username_title_id_idx",
+    PostModel.username,
+    PostModel.title,
+    PostModel.id,
+)
+drafts_username_created_index = Index(
+    "drafts_username_created_id_idx",
+    DraftModel.username,
+    DraftModel.created,
+    DraftModel.id,
+)
+drafts_username_title_index = Index(
+    "drafts_username_title_id_idx",
+    DraftModel.username,
+    DraftModel.title,
+    DraftModel.id,
+)
+tag_post_index = Index(
+    "association_table_tag_id_post_id_idx",
+    association_table.c.tag_id,
+    association_table.c.post_id,
+)
+posts_search_index = Index(
+    "posts_search_vector_idx",
+    PostModel.search_vector,
+    postgresql_using="gin",
+)
+posts_url_index = Index("posts_url_idx", PostModel.url, unique=True)
@@ -1,10 +1,12 @@
 from datetime import datetime
 from typing import Protocol, TypeVar, Generic
 
-from sqlalchemy import select, insert
+from sqlalchemy import select, insert, tuple_
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.web.core.schemas import Sort
+
 
 class RepoProtocol(Protocol):
     async def get(self, *args, **kwargs):
@@ -72,6 +74,47 @@ class OneToManyRelRepoMixin:
         if record is not None:
             return record
 
+    def _list(self, username, *, sort, desc_, after, page, per_page):
+        """Return a SELECT of one page of the user's records
+
+        The records are sorted by `(title, id)` or `(created, id)` *before*
+        they are paginated, which the `(username, title, id)` and
+        `(username, created, id)` indexes serve directly. Given `after`, the
+        key of the last record of the previous page, the page is found by
+        the keyset instead of `OFFSET`, so every page costs the same.
+
+        One extra record is fetched so the caller can tell whether there is
+        a next page.
+        """
+        column = self.model.title if sort is Sort.TITLE else self.model.created
+        keys = (
+            (column.desc(), self.model.id.desc()) if desc_ else (column, self.model.id)
+        )
+
+        stmt = (
+            select(self.model)
+            .where(self.model.username == username)
+            .order_by(*keys)
+            .limit(per_page + 1)
+        )
+        if after is None:
+            return stmt.offset((page - 1) * per_page)
+
+        key, after = tuple_(column, self.model.id), tuple_(*after)
+        return stmt.where(key < after if desc_ else key > after)
+
+    async def version(self, username, self_id) -> dict | None:
+        """Return the id, `created` and `updated` of the record, a cheap
+        probe for conditional requests which never loads the body"""
+        stmt = (
+            select(self.model.id, self.model.created, self.model.updated)
+            .where(self.model.username == username)
+            .where(self.model.id == self_id)
+        )
+        version = (await self.session.execute(stmt)).mappings().one_or_none()
+        if version is not None:
+            return dict(version)
+
     async def exists(self, self_id) -> bool:
         return bool(await super().get(self_id))
 
@@ -97,6 +140,8 @@ class OneToManyRelRepoMixin:
         for key, value in data.items():
             setattr(record, key, value)
         setattr(record, "updated", datetime.utcnow())
+        # the columns postgres generates, e.g. the excerpt, come back with it
+        await self.session.flush()
         return record
 
     async def delete(self, username, self_id) -> bool | None:
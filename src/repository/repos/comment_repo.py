@@ -1,7 +1,20 @@
-from sqlalchemy import update, select, func, String
-from sqlalchemy.exc import IntegrityError
+from datetime import datetime
+
+from sqlalchemy import (
+    update,
+    select,
+    insert,
+    delete,
+    case,
+    func,
+    literal,
+    true,
+    tuple_,
+    String,
+    Integer,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, array
 from sqlalchemy.sql import expression
-from sqlalchemy_utils import Ltree
 from sqlalchemy_utils.types.ltree import LQUERY, LtreeType
 
 from src.repository.models import CommentModel, PostModel
@@ -13,259 +26,366 @@ class CommentRepo(OneToManyRelRepoMixin, BaseRepo[CommentModel]):
     def __init__(self, session):
         super().__init__(session=session, model=CommentModel)
 
+    def _columns(self):
+        return (
+            self.model.id,
+            self.model.created,
+            self.model.updated,
+            self.model.comment,
+            self.model.parent_id,
+            expression.cast(self.model.path, String).label("path"),
+            self.model.post_id,
+            self.model.username,
+            self.model.reply_count,
+            self.model.children_count,
+        )
+
     async def add(self, username, data) -> dict | None:
-        try:
-            record = await super().add(username, data)
-        except IntegrityError:
-            return None
+        """Insert a comment with its path in one round trip
 
+        The id is taken from the sequence in a CTE, so the path can be
+        derived in the same INSERT ... SELECT: a base comment is selected
+        from its post and a reply from its parent. A missing post or parent
+        inserts nothing and `None` is returned.
+
+        The counters of the post and of the ancestors of a reply are bumped
+        by data-modifying CTEs of the same statement.
+        """
+        comments = self.model.__table__
+        new_id = select(
+            func.nextval(
+                func.pg_get_serial_sequence(self.model.__tablename__, "id"),
+            ).label("id"),
+        ).cte("new_id")
+        new_path = func.text2ltree(expression.cast(new_id.c.id, String))
+
+        stmt = insert(comments)
         if data["parent_id"] is None:
-            add_path_stmt = (
-                update(self.model)
-                .where(self.model.id == record.id)
-                .values(path=Ltree(str(record.id)))
+            # the post is found by the UPDATE of its counters
+            post = (
+                self._bump_post_counters(data["post_id"], 1, 1)
+                .returning(PostModel.id)
+                .cte("post")
             )
+            source = select(new_id.c.id, new_path).join_from(new_id, post, true())
         else:
             # new_path: parent_path + self.id
-            parent_path_stmt = select(self.model.path).where(
-                self.model.id == data["parent_id"],
+            parent = comments.alias("parent")
+            source = select(
+                new_id.c.id,
+                parent.c.path.op("||", return_type=LtreeType)(new_path),
+            ).join_from(new_id, parent, true())
+            source = source.where(
+                parent.c.id == data["parent_id"],
+                parent.c.post_id == data["post_id"],
             )
-            parent_path = (await self.session.execute(parent_path_stmt)).scalar_one()
-            add_path_stmt = (
-                update(self.model)
-                .where(self.model.id == record.id)
-                .values(path=Ltree(parent_path) + Ltree(str(record.id)))
+
+            parent_path = (
+                select(comments.c.path)
+                .where(comments.c.id == data["parent_id"])
+                .where(comments.c.post_id == data["post_id"])
+                .scalar_subquery()
             )
-        await self.session.execute(add_path_stmt)
+            bump = self._bump_counters(parent_path, data["parent_id"], 1)
+            post_bump = self._bump_post_counters(data["post_id"], 1, 0).where(
+                parent_path.is_not(None),
+            )
+            stmt = stmt.add_cte(
+                bump.returning(self.model.id).cte("bump"),
+                post_bump.returning(PostModel.id).cte("post_bump"),
+            )
+
+        source = source.add_columns(
+            literal(data["post_id"], self.model.post_id.type),
+            literal(data["parent_id"], self.model.parent_id.type),
+            literal(data["comment"], self.model.comment.type),
+            literal(username, self.model.username.type),
+            literal(datetime.utcnow(), self.model.created.type),
+            literal(0, self.model.reply_count.type),
+            literal(0, self.model.children_count.type),
+        )
+        stmt = stmt.from_select(
+            [
+                "id",
+                "path",
+                "post_id",
+                "parent_id",
+                "comment",
+                "username",
+                "created",
+                "reply_count",
+                "children_count",
+            ],
+            source,
+        ).returning(*self._columns())
 
-        to_ret = record.sync_dict()
-        to_ret["reply_count"] = 0
-        return to_ret
+        comment = (await self.session.execute(stmt)).mappings().one_or_none()
+        if comment is not None:
+            return dict(comment)
+
+    async def preview(
+        self,
+        post_id,
+        comment_id,
+        *,
+        depth: int,
+        per_node: int,
+        after: tuple | None,
+        limit: int,
+    ) -> list[dict]:
+        """Return a page of comments with at most `per_node` replies per
+        comment, expanded down to `depth` levels
+
+        The first level (the base comments, or the replies of `comment_id`)
+        is paginated like `list`. The deeper levels are walked by a recursive
+        CTE whose recursive term takes the first `per_node` replies of each
+        comment with a LATERAL subquery, so the cost is bounded by the size
+        of the result and not by the size of the thread.
+
+        `remaining_children` tells how many replies of a comment are not in
+        the result. The rows are in thread order, parents before children,
+        and the threads are in the order of their first level comments.
+        """
+        top = (
+            select(*self._columns())
+            .where(self.model.post_id == post_id)
+            .where(
+                self.model.parent_id.is_(None)
+                if comment_id == 0
+                else self.model.parent_id == comment_id,
+            )
+            .order_by(self.model.created, self.model.id)
+            .limit(limit + 1)
+        )
+        if after is not None:
+            top = top.where(
+                tuple_(self.model.created, self.model.id) > tuple_(*after),
+            )
+        top = top.subquery("top")
+
+        preview = select(
+            top,
+            literal(0).label("depth"),
+            func.row_number().over(order_by=(top.c.created, top.c.id)).label("rank"),
+            array([top.c.id]).label("thread"),
+        ).cte("preview", recursive=True)
+
+        replies = (
+            select(*self._columns())
+            .where(self.model.parent_id == preview.c.id)
+            .order_by(self.model.created, self.model.id)
+            .limit(per_node)
+            .lateral("replies")
+        )
+        preview = preview.union_all(
+            select(
+                replies,
+                preview.c.depth + 1,
+                preview.c.rank,
+                preview.c.thread.op("||")(replies.c.id),
+            )
+            .join_from(preview, replies, true())
+            .where(preview.c.depth < depth)
+            # the extra row of the page is only there to tell if there is
+            # a next page, its replies are not needed
+            .where(preview.c.rank <= limit),
+        )
+
+        remaining_children = case(
+            (
+                preview.c.depth < depth,
+                preview.c.children_count
+                - func.least(preview.c.children_count, per_node),
+            ),
+            else_=preview.c.children_count,
+        ).label("remaining_children")
+        stmt = select(
+            *[
+                column
+                for column in preview.columns
+                if column.name not in ("depth", "rank", "thread")
+            ],
+            remaining_children,
+        ).order_by(preview.c.rank, preview.c.thread)
+
+        comments_mappings = (await self.session.execute(stmt)).mappings().all()
+        return list(map(dict, comments_mappings))
+
+    async def stream(self, post_id, chunk_size=500):
+        """Yield every comment of a post in thread order
+
+        The labels of the paths are ids, which compare as text in `ltree`
+        (`10` before `9`), so the paths are ordered as arrays of integers.
+        No index has that order, so the database sorts the post's comments
+        by the `post_id` index first. The rows then come from a server-side
+        cursor `chunk_size` at a time, so the memory of the app stays flat
+        regardless of the size of the thread.
+        """
+        thread = expression.cast(
+            func.string_to_array(expression.cast(self.model.path, String), "."),
+            ARRAY(Integer),
+        )
+        stmt = (
+            select(*self._columns())
+            .where(self.model.post_id == post_id)
+            .order_by(thread)
+            .execution_options(yield_per=chunk_size)
+        )
+        result = await self.session.stream(stmt)
+        async for comment in result.mappings():
+            yield dict(comment)
 
     async def update(self, username, self_id, data) -> dict | None:
         comment = await super().update(username, self_id, data)
         if comment is None:
             return None
-        comment = comment.sync_dict()
-
-        reply_count = (
-            await self.session.execute(
-                select(func.count() - 1).filter(
-                    self.model.path.descendant_of(
-                        expression.cast(
-                            expression.cast(
-                                select(self.model.path)
-                                .where(self.model.id == self_id)
-                                .scalar_subquery(),
-                                String,
-                            ),
-                            LtreeType,
-                        ),
-                    ),
-                ),
+
+        await self.session.execute(
+            update(PostModel)
+            .where(PostModel.id == comment.post_id)
+            .values(comments_updated=comment.updated),
+        )
+        return comment.sync_dict()
+
+    async def delete(self, username, self_id, post_id=None) -> int:
+        """Delete a comment with all of its replies and return the count
+
+        The whole subtree goes in a single `DELETE ... WHERE path <@ :path`,
+        nothing is loaded into the session. Only the owner of the comment
+        can delete it, otherwise nothing is deleted and 0 is returned.
+        If `post_id` is given, the comment must also be on that post.
+
+        The counters of the post and of the ancestors are decreased by
+        data-modifying CTEs of the same statement.
+        """
+        target = (
+            select(
+                self.model.id,
+                self.model.post_id,
+                self.model.parent_id,
+                self.model.path,
+                self.model.reply_count,
+            )
+            .where(self.model.id == self_id)
+            .where(self.model.username == username)
+        )
+        if post_id is not None:
+            target = target.where(self.model.post_id == post_id)
+        target = target.cte("target")
+
+        bump = self._bump_counters(
+            target.c.path,
+            target.c.parent_id,
+            -(target.c.reply_count + 1),
+            increase=False,
+        ).where(self.model.id != target.c.id)
+        post_bump = self._bump_post_counters(
+            target.c.post_id,
+            -(target.c.reply_count + 1),
+            -case((target.c.parent_id.is_(None), 1), else_=0),
+        )
+        deleted = (
+            delete(self.model)
+            .where(self.model.path.descendant_of(target.c.path))
+            .returning(self.model.id)
+            .cte("deleted")
+        )
+
+        stmt = (
+            select(func.count())
+            .select_from(deleted)
+            .add_cte(
+                bump.returning(self.model.id).cte("bump"),
+                post_bump.returning(PostModel.id).cte("post_bump"),
             )
-        ).scalar()
-        comment["reply_count"] = reply_count
-        return comment
+        )
+        return (await self.session.execute(stmt)).scalar_one()
 
-    def _reply_count_of(self, stmt):
+    def _bump_counters(self, parent_path, parent_id, by, increase=True):
+        """Return an UPDATE which adds `by` to `reply_count` of every ancestor
+        in `parent_path` and adds (or takes) one to `children_count` of the
+        direct parent"""
         return (
-            (
-                select(func.count() - 1).filter(
-                    self.model.path.descendant_of(
-                        expression.cast(
-                            expression.cast(stmt.columns.path, String),
-                            LtreeType,
-                        ),
-                    ),
-                )
+            update(self.model)
+            .where(self.model.path.ancestor_of(parent_path))
+            .values(
+                reply_count=self.model.reply_count + by,
+                children_count=self.model.children_count
+                + case((self.model.id == parent_id, 1 if increase else -1), else_=0),
             )
-            .scalar_subquery()
-            .label("reply_count")
         )
 
-    async def list(self, post_id, comment_id, reply_level) -> list[dict]:
-        # Base query
-        """
-        select *,
-          (
-            select count(*)-1
-            from comments
-            where path <@ c.path::varchar::ltree
-          ) as reply_count
-        from comments as c
-        where post_id = 30 and c.path ~ '*{1}'::lquery;    <--- level of replies ----> {1,n}
-
-         post_id | parent_id | comment | id |          created           | user_id | path | reply_count
-        ---------+-----------+---------+----+----------------------------+---------+------+-------------
-              30 |           | first   | 33 | 2023-09-22 12:04:03.000081 |       1 | 33   |           4
-              30 |           | first   | 34 | 2023-09-22 12:04:20.650722 |       1 | 34   |          26
-        (2 rows)
-
-        ------------------------------------------------------------------------------------------------------------------------
-
-        select *,
-          (
-            select count(*)-1
-            from comments
-            where path <@ c.path::varchar::ltree
-          ) as reply_count
-        from comments as c
-        where post_id = 30
-              and path ~ '*{1,2}'::lquery limit 10;
-
-         post_id | parent_id |         comment         | id |          created           | user_id | path  | reply_count
-        ---------+-----------+-------------------------+----+----------------------------+---------+-------+-------------
-              30 |        34 | new reply!!!!           | 62 | 2023-09-22 14:17:46.215701 |       1 | 34.62 |           0
-              30 |           | first                   | 33 | 2023-09-22 12:04:03.000081 |       1 | 33    |           4
-              30 |           | first                   | 34 | 2023-09-22 12:04:20.650722 |       1 | 34    |          26
-              30 |        33 | Fuck comment with id 33 | 35 | 2023-09-22 12:58:00.741881 |       1 | 33.35 |           3
-              30 |        34 | new reply!!!!           | 38 | 2023-09-22 12:59:56.943715 |       1 | 34.38 |           0
-              30 |        34 | new reply!!!!           | 40 | 2023-09-22 14:17:36.83443  |       1 | 34.40 |           0
-              30 |        34 | new reply!!!!           | 41 | 2023-09-22 14:17:40.143331 |       1 | 34.41 |           0
-              30 |        34 | new reply!!!!           | 42 | 2023-09-22 14:17:41.016705 |       1 | 34.42 |           0
-              30 |        34 | new reply!!!!           | 43 | 2023-09-22 14:17:41.72033  |       1 | 34.43 |           0
-              30 |        34 | new reply!!!!           | 44 | 2023-09-22 14:17:42.465742 |       1 | 34.44 |           0
-        (10 rows)
-
-        """  # noqa: E501
-
-        # Specific comment with some level
+    @staticmethod
+    def _bump_post_counters(post_id, all_by, base_by):
+        """Return an UPDATE of the comment counters of the post"""
+        return (
+            update(PostModel)
+            .where(PostModel.id == post_id)
+            .values(
+                all_comments_count=PostModel.all_comments_count + all_by,
+                base_comments_count=PostModel.base_comments_count + base_by,
+                comments_updated=datetime.utcnow(),
+            )
+        )
+
+    async def list(
+        self,
+        post_id,
+        comment_id,
+        reply_level,
+        *,
+        after: tuple | None,
+        limit: int,
+    ) -> list[dict]:
+        """Return the base comments of a post or the replies of a comment
+
+        `reply_count` and `children_count` are materialized on each row,
+        so no per-row counting subquery is needed. A single level is read by
+        `parent_id`, from an index which serves the page directly:
+
+            -- base comments, by the partial `WHERE parent_id IS NULL` index
+            select * from comments where post_id = :post_id
+            and parent_id is null;
+
+            -- replies of the comment with id 33, by `(parent_id, created, id)`
+            select * from comments where parent_id = 33;
+
+        More levels of replies are matched by an lquery on the path:
+
+            select * from comments where path ~ '*{1,n}'::lquery;
+            select * from comments where path ~ '*.33.*{1,n}'::lquery;
+
+        The rows are paginated by the `(created, id)` keyset: `after` is the
+        key of the last row of the previous page. One extra row is fetched
+        so the caller can tell whether there is a next page.
         """
-         select *,
-           (
-             select count(*)-1
-             from comments
-             where path <@ c.path::varchar::ltree
-           ) as reply_count
-         from comments as c
-         where c.path ~ '*.33.*{0,3}'::lquery;   <--- comments.id <= 33
- select *, (select count(*)-1 from comments where path <@ c.path::varchar::ltree) as reply_count from comments as c where post_id = 30 and
- path ~ '*{1}'::lquery;
- post_id | parent_id | comment | id |          created           | user_id | path | reply_count
----------+-----------+---------+----+----------------------------+---------+------+-------------
-      30 |           | first   | 33 | 2023-09-22 12:04:03.000081 |       1 | 33   |           4
-      30 |           | first   | 34 | 2023-09-22 12:04:20.650722 |       1 | 34   |          26
-(2 rows)
-
- post_id | parent_id |         comment         | id |          created           | user_id |    path     | reply_count
----------+-----------+-------------------------+----+----------------------------+---------+-------------+-------------
-      30 |        36 | Hello from Reza         | 65 | 2023-09-25 17:53:45.337907 |       1 | 33.35.36.65 |           0
-      30 |           | first                   | 33 | 2023-09-22 12:04:03.000081 |       1 | 33          |           4
-      30 |        33 | Fuck comment with id 33 | 35 | 2023-09-22 12:58:00.741881 |       1 | 33.35       |           3
-      30 |        35 | Fuck comment with id 35 | 36 | 2023-09-22 12:58:31.830025 |       1 | 33.35.36    |           1
-      30 |        35 | new reply               | 37 | 2023-09-22 12:59:41.37042  |       1 | 33.35.37    |           0
-(5 rows)
-        """  # noqa: E501
-
-        if comment_id == 0:
-            # only the base comments
-            if reply_level is ReplyLevel.BASE:
-                # no reps
-                stmt = (
-                    select(
-                        self.model.id,
-                        self.model.created,
-                        self.model.comment,
-                        self.model.parent_id,
-                        expression.cast(self.model.path, String),
-                        self.model.post_id,
-                        self.model.username,
-                    )
-                    .join(PostModel, PostModel.id == post_id)
-                    .filter(
-                        self.model.path.lquery(
-                            expression.cast(expression.cast("*{1}", String), LQUERY),
-                        ),
-                    )
-                    .order_by("path")
-                ).subquery()
-            else:
-                stmt = (
-                    select(
-                        self.model.id,
-                        self.model.created,
-                        self.model.comment,
-                        self.model.parent_id,
-                        expression.cast(self.model.path, String),
-                        self.model.post_id,
-                        self.model.username,
-                    )
-                    .join(PostModel, PostModel.id == post_id)
-                    .filter(
-                        self.model.path.lquery(
-                            expression.cast(
-                                expression.cast(
-                                    "*{1," + str(int(reply_level.value) + 1) + "}",
-                                    String,
-                                ),
-                                LQUERY,
-                            ),
-                        ),
-                    )
-                    .order_by("path")
-                ).subquery()
-            comments = select(stmt, self._reply_count_of(stmt))
+        if reply_level is ReplyLevel.BASE:
+            level = (
+                self.model.parent_id.is_(None)
+                if comment_id == 0
+                else self.model.parent_id == comment_id
+            )
         else:
-            # other comments
-            if reply_level is ReplyLevel.BASE:
-                stmt = (
-                    select(
-                        self.model.id,
-                        self.model.created,
-                        self.model.comment,
-                        self.model.parent_id,
-                        expression.cast(self.model.path, String),
-                        self.model.post_id,
-                        self.model.username,
-                    )
-                    .filter(
-                        self.model.path.lquery(
-                            expression.cast(
-                                expression.cast(
-                                    "*."
-                                    + str(comment_id)
-                                    + ".*{1,"
-                                    + str(int(reply_level.value) + 1)
-                                    + "}",
-                                    String,
-                                ),
-                                LQUERY,
-                            ),
-                        ),
-                    )
-                    .order_by("path")
-                ).subquery()
+            depth = str(int(reply_level.value) + 1)
+            if comment_id == 0:
+                lquery = "*{1," + depth + "}"
             else:
-                stmt = (
-                    select(
-                        self.model.id,
-                        self.model.created,
-                        self.model.comment,
-                        self.model.parent_id,
-                        expression.cast(self.model.path, String),
-                        self.model.post_id,
-                        self.model.username,
-                    )
-                    .filter(
-                        self.model.path.lquery(
-                            expression.cast(
-                                expression.cast(
-                                    "*."
-                                    + str(comment_id)
-                                    + ".*{1,"
-                                    + str(int(reply_level.value) + 1)
-                                    + "}",
-                                    String,
-                                ),
-                                LQUERY,
-                            ),
-                        ),
-                    )
-                    .order_by("path")
-                ).subquery()
-            comments = select(stmt, self._reply_count_of(stmt))
-        comments_mappings = (
-            (await self.session.execute(comments.order_by("created"))).mappings().all()
+                lquery = "*." + str(comment_id) + ".*{1," + depth + "}"
+            level = self.model.path.lquery(
+                expression.cast(expression.cast(lquery, String), LQUERY),
+            )
+
+        stmt = (
+            select(*self._columns())
+            .where(self.model.post_id == post_id)
+            .where(level)
+            .order_by(self.model.created, self.model.id)
+            .limit(limit + 1)
         )
+        if after is not None:
+            stmt = stmt.where(
+                tuple_(self.model.created, self.model.id) > tuple_(*after),
+            )
+
+        comments_mappings = (await self.session.execute(stmt)).mappings().all()
         return list(map(dict, comments_mappings))
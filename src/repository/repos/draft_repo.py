@@ -1,6 +1,4 @@
-import itertools
-
-from sqlalchemy import desc, select
+from sqlalchemy import select
 
 from src.repository.models import DraftModel, PostModel
 from src.repository.repos import BaseRepo, OneToManyRelRepoMixin
@@ -13,6 +11,10 @@ class DraftRepo(OneToManyRelRepoMixin, BaseRepo[DraftModel]):
     def __init__(self, session):
         super().__init__(session, model=DraftModel)
 
+    def _columns(self, body=True):
+        """Return the columns of a draft, without the `body` for list views"""
+        return [c for c in self.model.__table__.c if body or c.key != "body"]
+
     async def list(
         self,
         username,
@@ -21,21 +23,32 @@ class DraftRepo(OneToManyRelRepoMixin, BaseRepo[DraftModel]):
         per_page: int,
         sort: Sort,
         desc_: bool,
+        after: tuple | None = None,
+        body: bool = False,
     ) -> list[dict]:
-        order_by_column = self.model.title if sort is Sort.TITLE else self.model.created
+        """Return a page of the user's drafts, with their bodies if `body`"""
+        stmt = self._list(
+            username,
+            sort=sort,
+            desc_=desc_,
+            after=after,
+            page=page,
+            per_page=per_page,
+        ).with_only_columns(*self._columns(body))
+        drafts = (await self.session.execute(stmt)).mappings().all()
+        return [dict(draft) for draft in drafts]
+
+    async def stream(self, username, chunk_size=500):
+        """Yield every draft of the user in id order from a server-side cursor"""
         stmt = (
-            select(self.model)
+            select(*self._columns())
             .where(self.model.username == username)
-            .offset((page - 1) * per_page)
-            .limit(per_page)
-            .order_by(
-                desc(order_by_column) if desc_ else order_by_column,
-            )
-        )
-        records = list(
-            itertools.chain.from_iterable((await self.session.execute(stmt)).all()),
+            .order_by(self.model.id)
+            .execution_options(yield_per=chunk_size)
         )
-        return [record.sync_dict() for record in records]
+        result = await self.session.stream(stmt)
+        async for draft in result.mappings():
+            yield dict(draft)
 
     async def publish(self, user, draft_id, tags_and_title_in_url) -> Post | None:
         draft = await super(OneToManyRelRepoMixin, self).get(draft_id)
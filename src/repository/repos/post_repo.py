@@ -1,8 +1,10 @@
-from sqlalchemy import select, func, desc
+from datetime import datetime
+
+from sqlalchemy import select, update, func, literal, tuple_, insert
+from sqlalchemy.dialects.postgresql import REAL, REGCONFIG, insert as pg_insert
 
 from src.repository.models import (
     PostModel,
-    UserModel,
     CommentModel,
     TagModel,
     association_table,
@@ -11,31 +13,56 @@ from src.repository.repos import BaseRepo, OneToManyRelRepoMixin
 from src.repository.repos.tag_repo import TagRepo
 from src.web.core.schemas import Sort
 
+SEARCH_CONFIG = "english"
+SNIPPET_OPTIONS = "StartSel=<b>, StopSel=</b>, MaxWords=35, MinWords=15, MaxFragments=2"
+
+
+def html_escape(text):
+    """Escape the characters of `text` which are special in HTML, in SQL"""
+    for char, entity in (
+        ("&", "&amp;"),
+        ("<", "&lt;"),
+        (">", "&gt;"),
+        ('"', "&quot;"),
+        ("'", "&#x27;"),
+    ):
+        text = func.replace(text, char, entity)
+    return text
+
 
 class PostRepo(OneToManyRelRepoMixin, BaseRepo[PostModel]):
     def __init__(self, session):
         super().__init__(session, PostModel)
 
+    def _columns(self, body=True):
+        """Return the columns of a post, without its search vector
+
+        List views leave out the `body` too and show the `excerpt` instead.
+        """
+        skipped = {"search_vector"} if body else {"search_vector", "body"}
+        return [c for c in self.model.__table__.c if c.key not in skipped]
+
     async def get(self, username, self_id) -> dict | None:
-        post = (
-            select(self.model)
+        stmt = (
+            select(*self._columns())
             .where(self.model.id == self_id)
             .where(self.model.username == username)
-        ).subquery("post")
+        )
+        post = (await self.session.execute(stmt)).mappings().one_or_none()
+        if post is not None:
+            return (await self._with_tags([post]))[0]
 
-        post_with_tags = (
-            select(
-                post,
-                func.array_agg(TagModel.name).label("tags"),
-            ).outerjoin(
-                association_table.join(TagModel),
-                post.columns.id == association_table.columns.post_id,  # noqa
-            )
-        ).group_by(post)
+    async def _with_tags(self, posts) -> list[dict]:
+        """Attach the tags of the posts from a second, batched query
 
-        post = (await self.session.execute(post_with_tags)).mappings().one_or_none()
-        if post is not None:
-            return dict(post)
+        Aggregating the tags in the post query would need a GROUP BY over
+        every column of the post, bodies included.
+        """
+        posts = list(map(dict, posts))
+        tags = await TagRepo(self.session).names_by_post([p["id"] for p in posts])
+        for post in posts:
+            post["tags"] = tags.get(post["id"], [])
+        return posts
 
     async def add(self, username, data: dict) -> dict:
         tags = data.pop("tags")
@@ -47,6 +74,75 @@ class PostRepo(OneToManyRelRepoMixin, BaseRepo[PostModel]):
 
         return record.sync_dict()
 
+    async def stream(self, username, chunk_size=500):
+        """Yield every post of the user, with its sorted tags, in id order
+
+        The rows come from a server-side cursor `chunk_size` at a time and
+        the tags are read by a correlated subquery of each row, so nothing
+        is grouped or collected in memory.
+        """
+        tags = (
+            select(TagModel.name)
+            .join(association_table, association_table.c.tag_id == TagModel.id)
+            .where(association_table.c.post_id == self.model.id)
+            .order_by(TagModel.name)
+            .scalar_subquery()
+        )
+        stmt = (
+            select(*self._columns(), func.array(tags).label("tags"))
+            .where(self.model.username == username)
+            .order_by(self.model.id)
+            .execution_options(yield_per=chunk_size)
+        )
+        result = await self.session.stream(stmt)
+        async for post in result.mappings():
+            yield dict(post)
+
+    async def add_many(self, username, posts: list[dict]) -> dict[str, int]:
+        """Insert the posts and their tags with multi-row INSERTs
+
+        All the distinct tags are upserted in one statement, then the posts
+        and their `association_table` rows are inserted with one statement
+        each. A post whose url is taken is skipped. Returns the ids of the
+        inserted posts by their url.
+        """
+        if not posts:
+            return {}
+
+        tag_ids = await TagRepo(self.session).upsert(
+            {tag for post in posts for tag in post["tags"]},
+        )
+
+        now = datetime.utcnow()
+        stmt = (
+            pg_insert(self.model.__table__)
+            .values(
+                [
+                    {
+                        "title": post["title"],
+                        "body": post["body"],
+                        "url": post["url"],
+                        "username": username,
+                        "created": now,
+                    }
+                    for post in posts
+                ],
+            )
+            .on_conflict_do_nothing(index_elements=[self.model.url])
+            .returning(self.model.id, self.model.url)
+        )
+        ids = {url: post_id for post_id, url in await self.session.execute(stmt)}
+
+        tags = [
+            {"post_id": ids[post["url"]], "tag_id": tag_ids[tag]}
+            for post in posts
+            if post["url"] in ids
+            for tag in post["tags"]
+        ]
+        if tags:
+            await self.session.execute(insert(association_table).values(tags))
+        return ids
+
     async def update(self, username, post_id, data) -> dict | None:
         tags = data.pop("tags")
 
@@ -62,60 +158,68 @@ class PostRepo(OneToManyRelRepoMixin, BaseRepo[PostModel]):
 
         return record.sync_dict()
 
-    async def get_post_with_url(self, username, url) -> dict | None:
-        post = (
-            select(self.model)
-            .join(UserModel, self.model.username == username)
-            .where(self.model.url == url)
-        ).subquery("post")
-
-        post_with_tags = (
-            (
-                select(
-                    post,
-                    func.array_agg(TagModel.name).label("tags"),
-                ).outerjoin(
-                    association_table.join(TagModel),
-                    post.columns.id == association_table.columns.post_id,  # noqa
-                )
-            ).group_by(post)
-        ).subquery("post_with_tags")
-
-        all_comments_count = (
-            (
-                select(func.count("*"))
-                .select_from(CommentModel)
-                .where(CommentModel.post_id == post_with_tags.columns.id)
-            )
-            .scalar_subquery()
-            .label("all_comments_count")
+    async def get_post_with_url(self, url) -> dict | None:
+        """Return the post with the url, served by the unique url index"""
+        reply_comments_count = (
+            self.model.all_comments_count - self.model.base_comments_count
+        ).label("reply_comments_count")
+        stmt = select(*self._columns(), reply_comments_count).where(
+            self.model.url == url,
         )
+        post = (await self.session.execute(stmt)).mappings().one_or_none()
+        if post is not None:
+            return (await self._with_tags([post]))[0]
+
+    async def comments_version(self, post_id) -> dict | None:
+        """Return what the comments of the post change with"""
+        stmt = select(
+            self.model.id,
+            self.model.created,
+            self.model.all_comments_count,
+            self.model.comments_updated,
+        ).where(self.model.id == post_id)
+        version = (await self.session.execute(stmt)).mappings().one_or_none()
+        if version is not None:
+            return dict(version)
 
-        base_comments_count = (
-            (
-                select(func.count("*"))
-                .select_from(CommentModel)
-                .where(CommentModel.post_id == post_with_tags.columns.id)
-                .where(CommentModel.parent_id == None)  # noqa: E711
+    async def recount_comments(self, after_id, batch_size) -> int | None:
+        """Recompute the comment counters of the next `batch_size` posts
+
+        Returns the id of the last post of the batch, or `None` when there
+        are no posts after `after_id`.
+        """
+        batch = (
+            select(self.model.id)
+            .where(self.model.id > after_id)
+            .order_by(self.model.id)
+            .limit(batch_size)
+        ).cte("batch")
+
+        counts = (
+            select(
+                batch.c.id,
+                func.count(CommentModel.id).label("all_comments_count"),
+                func.count(CommentModel.id)
+                .filter(CommentModel.parent_id == None)  # noqa: E711
+                .label("base_comments_count"),
             )
-            .scalar_subquery()
-            .label("base_comments_count")
-        )
+            .outerjoin(CommentModel, CommentModel.post_id == batch.c.id)
+            .group_by(batch.c.id)
+        ).subquery("counts")
 
-        reply_comments_count = (
-            select(all_comments_count - base_comments_count)
-            .scalar_subquery()
-            .label("reply_comments_count")
-        )
-        stmt = select(
-            post_with_tags,
-            all_comments_count,
-            base_comments_count,
-            reply_comments_count,
+        stmt = (
+            update(self.model)
+            .where(self.model.id == counts.c.id)
+            .values(
+                all_comments_count=counts.c.all_comments_count,
+                base_comments_count=counts.c.base_comments_count,
+            )
+            .returning(self.model.id)
+            .execution_options(synchronize_session=False)
         )
-        post = (await self.session.execute(stmt)).mappings().one_or_none()
-        if post is not None:
-            return dict(post)
+        ids = (await self.session.execute(stmt)).scalars().all()
+        if ids:
+            return max(ids)
 
     async def list(
         self,
@@ -125,40 +229,127 @@ class PostRepo(OneToManyRelRepoMixin, BaseRepo[PostModel]):
         per_page: int,
         sort: Sort,
         desc_: bool,
+        after: tuple | None = None,
+        tags: set[str] | None = None,
+        match_all: bool = True,
+        body: bool = False,
     ) -> list[dict]:
         """Return a list of Post objects
 
-        This function paginates the results according to page and per_page
-        This function sorts the results according to `Sort` and `SortOrder` values
+        This function sorts the results according to `Sort` and `SortOrder` values,
+        then paginates them according to `after` or page and per_page.
+        Given `tags`, only the posts with all (or any) of them are listed.
+        The bodies are read only if `body` is true.
         """
-        order_by_column = self.model.title if sort is Sort.TITLE else self.model.created
+        stmt = self._list(
+            username,
+            sort=sort,
+            desc_=desc_,
+            after=after,
+            page=page,
+            per_page=per_page,
+        ).with_only_columns(*self._columns(body))
+        if tags:
+            stmt = stmt.where(self.model.id.in_(self._tagged(tags, match_all)))
+        return await self._with_tags(
+            (await self.session.execute(stmt)).mappings().all(),
+        )
 
-        posts = (
-            select(self.model)
-            .where(self.model.username == username)
-            .offset((page - 1) * per_page)
-            .limit(per_page)
-        ).subquery("posts")
-
-        posts_with_tags = (
-            (
-                select(
-                    posts,
-                    func.array_agg(TagModel.name).label("tags"),
-                ).outerjoin(
-                    association_table.join(TagModel),
-                    posts.columns.id == association_table.columns.post_id,  # noqa
-                )
-            )
-            .group_by(posts)
-            .order_by(
-                desc(order_by_column) if desc_ else order_by_column,
+    @staticmethod
+    def _tagged(tags: set[str], match_all: bool):
+        """Return a SELECT of the ids of the posts tagged with all (or any)
+        of `tags`, served by the `(tag_id, post_id)` index"""
+        stmt = (
+            select(association_table.c.post_id)
+            .join(TagModel, TagModel.id == association_table.c.tag_id)
+            .where(TagModel.name.in_(tags))
+        )
+        if match_all:
+            stmt = stmt.group_by(association_table.c.post_id).having(
+                func.count() == len(tags),
             )
+        return stmt
+
+    async def list_by_tag(self, name, *, after: tuple | None, limit: int):
+        """Return the newest posts of every user tagged with `name`
+
+        The page is read off the `(tag_id, post_id)` index backwards, so it
+        is paginated by the post id keyset: `after` is the id of the last
+        post of the previous page. One extra post is fetched so the caller
+        can tell whether there is a next page.
+        """
+        # the tag id is looked up first, so the planner can scan the index
+        # backwards and stop after the page instead of sorting the whole tag
+        tag_id = select(TagModel.id).where(TagModel.name == name).scalar_subquery()
+        ids = (
+            select(association_table.c.post_id)
+            .where(association_table.c.tag_id == tag_id)
+            .order_by(association_table.c.post_id.desc())
+            .limit(limit + 1)
         )
+        if after is not None:
+            ids = ids.where(association_table.c.post_id < after[0])
+        ids = ids.subquery("ids")
 
-        return list(
-            map(
-                dict,
-                (await self.session.execute(posts_with_tags)).mappings().fetchall(),
-            ),
+        stmt = (
+            select(*self._columns())
+            .join(ids, ids.c.post_id == self.model.id)
+            .order_by(self.model.id.desc())
+        )
+        return await self._with_tags(
+            (await self.session.execute(stmt)).mappings().all(),
         )
+
+    async def search(self, query, *, after: tuple | None, limit: int):
+        """Return the posts matching a web-search style `query`, best first
+
+        The `@@` match is served by the GIN index of the generated search
+        vector. Posts are ranked with `ts_rank` and paginated by the
+        `(rank, id)` keyset: `after` is the key of the last post of the
+        previous page. One extra post is fetched so the caller can tell
+        whether there is a next page.
+
+        Snippets are highlighted with `ts_headline`, which is expensive,
+        so it only runs on the posts of the page. The snippets are HTML,
+        so the bodies are escaped before the `<b>` markup is added.
+        """
+        config = literal(SEARCH_CONFIG, REGCONFIG)
+        tsquery = func.websearch_to_tsquery(config, query)
+        rank = func.ts_rank(self.model.search_vector, tsquery)
+        page = (
+            select(
+                self.model.id,
+                self.model.created,
+                self.model.title,
+                self.model.body,
+                self.model.url,
+                self.model.username,
+                rank.label("rank"),
+            )
+            .where(self.model.search_vector.bool_op("@@")(tsquery))
+            .order_by(rank.desc(), self.model.id.desc())
+            .limit(limit + 1)
+        )
+        if after is not None:
+            page = page.where(
+                tuple_(rank, self.model.id)
+                < tuple_(literal(after[0], REAL), literal(after[1])),
+            )
+        page = page.subquery("page")
+
+        snippet = func.ts_headline(
+            config,
+            html_escape(page.c.body),
+            tsquery,
+            SNIPPET_OPTIONS,
+        ).label("snippet")
+        stmt = select(
+            page.c.id,
+            page.c.created,
+            page.c.title,
+            page.c.url,
+            page.c.username,
+            page.c.rank,
+            snippet,
+        ).order_by(page.c.rank.desc(), page.c.id.desc())
+        return list(map(dict, (await self.session.execute(stmt)).mappings().all()))
@@ -1,6 +1,10 @@
+from collections import defaultdict
+from datetime import datetime
+
 from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
 
-from src.repository.models import TagModel
+from src.repository.models import TagModel, association_table
 from src.repository.repos import BaseRepo
 
 
@@ -24,3 +28,49 @@ class TagRepo(BaseRepo[TagModel]):
                 tags.append(t)
         self.session.add_all(tags)
         return tags
+
+    async def upsert(self, names) -> dict[str, int]:
+        """Create the missing tags and return the ids of all of them
+
+        A single statement inserts the new names and reads the existing
+        ones: rows inserted by a concurrent transaction are not visible to
+        it, so their names are looked up once more.
+        """
+        ids = {}
+        names = set(names)
+        while names:
+            inserted = (
+                insert(self.model)
+                .values(
+                    [{"name": name, "created": datetime.utcnow()} for name in names],
+                )
+                .on_conflict_do_nothing(index_elements=[self.model.name])
+                .returning(self.model.id, self.model.name)
+                .cte("inserted")
+            )
+            stmt = select(inserted.c.id, inserted.c.name).union_all(
+                select(self.model.id, self.model.name).where(
+                    self.model.name.in_(names),
+                ),
+            )
+            for tag_id, name in await self.session.execute(stmt):
+                ids[name] = tag_id
+            names -= ids.keys()
+        return ids
+
+    async def names_by_post(self, post_ids) -> dict[int, list[str]]:
+        """Return the sorted tag names of each post in one `post_id IN (...)`
+        query"""
+        if not post_ids:
+            return {}
+
+        stmt = (
+            select(association_table.c.post_id, self.model.name)
+            .join(self.model, self.model.id == association_table.c.tag_id)
+            .where(association_table.c.post_id.in_(post_ids))
+            .order_by(association_table.c.post_id, self.model.name)
+        )
+        names = defaultdict(list)
+        for post_id, name in await self.session.execute(stmt):
+            names[post_id].append(name)
+        return names
@@ -1,31 +1,12 @@
-from dataclasses import dataclass
 from datetime import datetime
 
-from sqlalchemy import select, func, inspect
+from sqlalchemy import select, func, inspect, tuple_, JSON
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 
 from src.repository.models import UserModel, PostModel, DraftModel
 from src.repository.repos import BaseRepo
 from src.service.objects import User
-from src.web.core.security import hash_password
-
-
-@dataclass
-class _Post:
-    title: str
-    url: str
-    created: datetime
-
-    def __bool__(self):
-        return all([self.title, self.url, self.created])
-
-
-@dataclass
-class _Draft:
-    title: str
-    created: datetime
-
-    def __bool__(self):
-        return all([self.title, self.created])
+from src.web.core.security import password_hasher
 
 
 class UserRepo(BaseRepo[UserModel]):
@@ -33,61 +14,92 @@ class UserRepo(BaseRepo[UserModel]):
         super().__init__(session=session, model=UserModel)
 
     async def get(self, self_id, raw=False) -> UserModel | User:
-        if raw:
-            return await super().get(self_id)
-        return User(**(await super().get(self_id)).sync_dict())
-
-    async def get_full(self, self_id):
-        stmt = (
-            select(
-                inspect(self.model).columns,
-                func.array_agg(PostModel.title).label("post_title"),
-                func.array_agg(PostModel.url).label("post_url"),
-                func.array_agg(PostModel.created).label("post_created"),
-                func.array_agg(DraftModel.title).label("draft_title"),
-                func.array_agg(DraftModel.created).label("draft_created"),
-            )
-            .outerjoin(PostModel, PostModel.username == self.model.username)
-            .outerjoin(DraftModel, DraftModel.username == self.model.username)
-            .filter(self.model.id == self_id)
-            .group_by(self.model)
+        record = await super().get(self_id)
+        if raw or record is None:
+            return record
+        return User(**record.sync_dict())
+
+    async def get_full(
+        self,
+        username,
+        *,
+        limit: int,
+        posts_after: tuple | None = None,
+        drafts_after: tuple | None = None,
+    ) -> dict | None:
+        """Return the user with a page of its newest posts and drafts
+
+        Each collection is a `json_agg` of its own `LIMIT`ed subquery, read
+        off the `(username, created, id)` index, instead of a join of the
+        user with both of them. So the cost is linear in the returned rows.
+        Given the key of the last post or draft of the previous page, the
+        collection continues after it. One extra row is fetched for each, so
+        the caller can tell whether there is a next page.
+        """
+        posts = self._page(
+            PostModel,
+            username,
+            (PostModel.title, PostModel.url),
+            limit=limit,
+            after=posts_after,
+        )
+        drafts = self._page(
+            DraftModel,
+            username,
+            (DraftModel.title,),
+            limit=limit,
+            after=drafts_after,
         )
-        user = dict((await self.session.execute(stmt)).mappings().one_or_none())
+        stmt = select(
+            inspect(self.model).columns,
+            posts.label("posts"),
+            drafts.label("drafts"),
+        ).where(self.model.username == username)
+        user = (await self.session.execute(stmt)).mappings().one_or_none()
+        if user is None:
+            return None
 
-        _post_titles = user.pop("post_title")
-        _post_urls = user.pop("post_url")
-        _post_createds = user.pop("post_created")
+        user = dict(user)
+        for collection in ("posts", "drafts"):
+            for row in user[collection]:
+                row["created"] = datetime.fromisoformat(row["created"])
+        return user
 
-        _draft_titles = user.pop("draft_title")
-        _draft_createds = user.pop("draft_created")
+    @staticmethod
+    def _page(model, username, columns, *, limit, after):
+        """Return a scalar subquery of a page of the user's records, as a
+        JSON array of `columns`, `created` and `id`, newest first"""
+        keys = (model.created.desc(), model.id.desc())
+        page = (
+            select(*columns, model.created, model.id)
+            .where(model.username == username)
+            .order_by(*keys)
+            .limit(limit + 1)
+        )
+        if after is not None:
+            page = page.where(tuple_(model.created, model.id) < tuple_(*after))
+        page = page.subquery()
 
-        user.update(
-            {
-                "posts": list(
-                    filter(
-                        bool,
-                        (
-                            _Post(*post)
-                            for post in zip(_post_titles, _post_urls, _post_createds)
-                        ),
-                    ),
-                ),
-            },
+        row = func.json_build_object(
+            *(item for c in page.c for item in (c.key, c)),
         )
-        user.update(
-            {
-                "drafts": list(
-                    filter(
-                        bool,
-                        (
-                            _Draft(*draft)
-                            for draft in zip(_draft_titles, _draft_createds)
+        return (
+            select(
+                func.coalesce(
+                    func.json_agg(
+                        aggregate_order_by(
+                            row,
+                            page.c.created.desc(),
+                            page.c.id.desc(),
                         ),
                     ),
+                    func.json_build_array(),
+                    type_=JSON,
                 ),
-            },
+            )
+            .select_from(page)
+            .scalar_subquery()
         )
-        return user
 
     async def get_by_username(self, username) -> dict | None:
         stmt = select(self.model).where(self.model.username == username)
@@ -96,7 +108,7 @@ class UserRepo(BaseRepo[UserModel]):
             return user.sync_dict()
 
     async def add(self, data) -> User | None:
-        data["password"] = hash_password(data["password"])
+        data["password"] = await password_hasher.hash(data["password"])
         user = await super().add(data)
         if user is None:
             return None
@@ -1,3 +1,16 @@
+from sqlalchemy import event
+
+
+def on_commit(session, callback):
+    """Call `callback` once the current transaction of `session` is committed"""
+    event.listen(
+        session.sync_session,
+        "after_commit",
+        lambda _: callback(),
+        once=True,
+    )
+
+
 class UnitOfWork:
     def __init__(self, session):
         self.session = session
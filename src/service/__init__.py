@@ -1,5 +1,24 @@
+from datetime import datetime
+
+from src.common.utils import decode_cursor, next_page
+from src.web.core.schemas import Sort
+
+
 class Service:
     def __init__(self, repo, **kwargs):
         self.repo = repo
         for key, value in kwargs.items():
             setattr(self, key, value)
+
+
+def decode_sort_cursor(cursor, sort: Sort) -> tuple | None:
+    """Unpack the cursor of a list of posts or drafts sorted by `sort`"""
+    if cursor is None:
+        return None
+    return decode_cursor(cursor, str if sort is Sort.TITLE else datetime, int)
+
+
+def sorted_page(rows: list, limit: int, sort: Sort) -> tuple[list, str | None]:
+    """Trim a page of posts or drafts sorted by `sort` and give its next cursor"""
+    column = "title" if sort is Sort.TITLE else "created"
+    return next_page(rows, limit, lambda row: (row[column], row["id"]))
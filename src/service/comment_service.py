@@ -1,8 +1,13 @@
 import functools
 import inspect
+from datetime import datetime
+from functools import partial
 
 from src.common.exceptions import CommentNotFoundError, PostNotFoundError
+from src.common.utils import decode_cursor, encode_cursor
+from src.repository.unit_of_work import on_commit
 from src.service import Service
+from src.web.core.schemas import Shape
 
 
 def _check_post_existence_decorator(async_method):
@@ -16,12 +21,32 @@ def _check_post_existence_decorator(async_method):
     return decorator
 
 
-def check_post_existence(decorator):
+def build_tree(comments: list[dict]) -> list[dict]:
+    """Nest the comments under their parents in a single pass
+
+    Parents are always created before their replies, so in the `(created, id)`
+    order of the rows every parent is seen before its children. A comment
+    whose parent is not among the rows (e.g. it is on a previous page)
+    becomes a root of the returned forest.
+    """
+    nodes, roots = {}, []
+    for comment in comments:
+        comment["children"] = []
+        nodes[comment["id"]] = comment
+        parent = nodes.get(comment["parent_id"])
+        if parent is None:
+            roots.append(comment)
+        else:
+            parent["children"].append(comment)
+    return roots
+
+
+def check_post_existence(decorator, exclude=()):
     def decorate(cls):
         for name, fn in [
             i
             for i in inspect.getmembers(cls, inspect.isroutine)
-            if not i[0].startswith("__")
+            if not i[0].startswith("__") and i[0] not in exclude
         ]:
             setattr(cls, name, decorator(fn))
         return cls
@@ -29,19 +54,127 @@ def check_post_existence(decorator):
     return decorate
 
 
-@check_post_existence(_check_post_existence_decorator)
+# `reply` finds out about a missing post from its own INSERT and
+# `get_comments` reads the post's version when the page is not cached
+@check_post_existence(
+    _check_post_existence_decorator,
+    exclude=("reply", "get_comments", "_invalidate"),
+)
 class CommentService(Service):
+    cache = None
+    page_cache = None
+
+    def _invalidate(self, post_id):
+        """Drop the cached comment pages and the rendered page of the post
+        once the changes are committed"""
+        for cache in (self.cache, self.page_cache):
+            if cache is not None:
+                on_commit(self.repo.session, partial(cache.invalidate, post_id))
+
     async def reply(self, *, username, post_id, comment_id, reply):
         reply = await self.repo.add(
             username,
             {"post_id": post_id, "parent_id": comment_id, "comment": reply},
         )
         if reply is None:
+            if not await self.post_repo.exists(post_id):
+                raise PostNotFoundError(post_id)
             raise CommentNotFoundError(comment_id)
+        self._invalidate(post_id)
         return reply
 
-    async def get_comments(self, *, post_id, comment_id, reply_level):
-        return await self.repo.list(post_id, comment_id, reply_level)
+    async def get_comments(
+        self,
+        *,
+        post_id,
+        comment_id,
+        reply_level,
+        cursor,
+        limit,
+        shape=Shape.FLAT,
+        depth=None,
+        per_node=None,
+        not_modified=None,
+    ):
+        """Return a page of comments, the cursor of the next page and the
+        version of the post's comments the page was read at
+
+        The page and its version are cached together, so a cached page is
+        served, or found not modified, without a query. Otherwise the version
+        is read first, and if `not_modified(version)` is true the page is not
+        read at all and `None, None, version` is returned.
+
+        The version and the page are read from one snapshot, so the version
+        cached with a page is the one the page was read at.
+        """
+        key = (
+            post_id,
+            comment_id,
+            reply_level,
+            cursor,
+            limit,
+            shape,
+            depth,
+            per_node,
+        )
+        if self.cache is not None:
+            page = self.cache.get(key, None)
+            if page is not None:
+                return page
+            since = self.cache.generation()
+
+        await self.repo.session.connection(
+            execution_options={"isolation_level": "REPEATABLE READ"},
+        )
+        version = await self.post_repo.comments_version(post_id)
+        if version is None:
+            raise PostNotFoundError(post_id)
+        if not_modified is not None and not_modified(version):
+            return None, None, version
+
+        after = None if cursor is None else decode_cursor(cursor, datetime, int)
+        if depth is None:
+            comments = await self.repo.list(
+                post_id,
+                comment_id,
+                reply_level,
+                after=after,
+                limit=limit,
+            )
+            top = comments
+        else:
+            comments = await self.repo.preview(
+                post_id,
+                comment_id,
+                depth=depth,
+                per_node=per_node,
+                after=after,
+                limit=limit,
+            )
+            top_parent_id = comment_id or None
+            top = [c for c in comments if c["parent_id"] == top_parent_id]
+
+        next_cursor = None
+        if len(top) > limit:
+            # the extra row is only fetched to tell if there is a next page
+            comments.remove(top[limit])
+            last = top[limit - 1]
+            next_cursor = encode_cursor(last["created"], last["id"])
+
+        if shape is Shape.TREE:
+            comments = build_tree(comments)
+
+        if self.cache is not None:
+            self.cache.set(
+                key,
+                (comments, next_cursor, version),
+                tag=post_id,
+                since=since,
+            )
+        return comments, next_cursor, version
+
+    async def export_comments(self, *, post_id):
+        return self.repo.stream(post_id)
 
     async def update_comment(self, *, username, post_id, comment_id, comment):
         comment = await self.repo.update(
@@ -51,9 +184,12 @@ class CommentService(Service):
         )
         if comment is None:
             raise CommentNotFoundError(comment_id)
+        self._invalidate(comment["post_id"])
         return comment
 
     async def delete_comment(self, *, username, post_id, comment_id):
-        result = await self.repo.delete(username, comment_id)
-        if result is False:
+        deleted = await self.repo.delete(username, comment_id, post_id)
+        if not deleted:
             raise CommentNotFoundError(comment_id)
+        self._invalidate(post_id)
+        return deleted
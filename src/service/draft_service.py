@@ -1,6 +1,6 @@
 from src.common.exceptions import DraftNotFoundError
 from src.repository.repos.user_repo import UserRepo
-from src.service import Service
+from src.service import Service, decode_sort_cursor, sorted_page
 from src.service.objects import Draft
 from src.web.core.schemas import Sort
 
@@ -17,14 +17,19 @@ class DraftService(Service):
         per_page: int,
         sort: Sort,
         desc_: bool,
-    ) -> list[Draft]:
-        return await self.repo.list(
+        cursor: str | None = None,
+        include_body: bool = False,
+    ) -> tuple[list[Draft], str | None]:
+        drafts = await self.repo.list(
             user.username,
             page=page,
             per_page=per_page,
             sort=sort,
             desc_=desc_,
+            after=decode_sort_cursor(cursor, sort),
+            body=include_body,
         )
+        return sorted_page(drafts, per_page, sort)
 
     async def get_draft(self, user, draft_id) -> Draft:
         draft = await self.repo.get(user.username, draft_id)
@@ -32,6 +37,12 @@ class DraftService(Service):
             raise DraftNotFoundError(draft_id)
         return draft
 
+    async def get_draft_version(self, user, draft_id):
+        version = await self.repo.version(user.username, draft_id)
+        if version is None:
+            raise DraftNotFoundError(draft_id)
+        return version
+
     async def update_draft(self, user, draft_id, draft_detail: dict):
         draft = await self.repo.update(user.username, draft_id, draft_detail)
         if draft is None:
@@ -1,7 +1,11 @@
+from functools import partial
+
 from src.common.exceptions import PostNotFoundError, UserNotFoundError
-from src.service import Service
+from src.common.utils import decode_cursor, next_page
+from src.repository.unit_of_work import on_commit
+from src.service import Service, decode_sort_cursor, sorted_page
 from src.service.objects import Post
-from src.web.core.schemas import Sort
+from src.web.core.schemas import Sort, TagMatch
 
 
 async def slugify(post, username):
@@ -13,6 +17,15 @@ async def slugify(post, username):
 
 
 class PostService(Service):
+    comment_cache = None
+    page_cache = None
+
+    def _invalidate(self, post_id, *caches):
+        """Drop the cached entries of the post once the changes are committed"""
+        for cache in caches:
+            if cache is not None:
+                on_commit(self.repo.session, partial(cache.invalidate, post_id))
+
     async def list_posts(
         self,
         username,
@@ -21,58 +34,107 @@ class PostService(Service):
         per_page: int,
         sort: Sort,
         desc_: bool,
-    ) -> list[Post]:
-        return await self.repo.list(
+        cursor: str | None = None,
+        tags: list[str] | None = None,
+        match: TagMatch = TagMatch.ALL,
+        include_body: bool = False,
+    ) -> tuple[list[Post], str | None]:
+        posts = await self.repo.list(
             username,
             page=page,
             per_page=per_page,
             sort=sort,
             desc_=desc_,
+            after=decode_sort_cursor(cursor, sort),
+            tags={tag.strip().lower() for tag in tags or ()},
+            match_all=match is TagMatch.ALL,
+            body=include_body,
+        )
+        return sorted_page(posts, per_page, sort)
+
+    async def search_posts(self, query, *, cursor, limit):
+        after = None if cursor is None else decode_cursor(cursor, float, int)
+        posts = await self.repo.search(query, after=after, limit=limit)
+        return next_page(posts, limit, lambda post: (post["rank"], post["id"]))
+
+    async def list_tagged_posts(self, name, *, cursor, limit):
+        after = None if cursor is None else decode_cursor(cursor, int)
+        posts = await self.repo.list_by_tag(
+            name.strip().lower(),
+            after=after,
+            limit=limit,
         )
+        return next_page(posts, limit, lambda post: (post["id"],))
 
     async def create_post(self, username, post):
         post_dict = await slugify(post, username)
         return await self.repo.add(username, post_dict)
 
+    async def import_posts(self, username, posts):
+        """Create a chunk of `(index, post)` pairs with a few multi-row INSERTs
+
+        Returns the ids of the created posts and the errors of the rest.
+        """
+        created, errors, chunk = [], [], {}
+        for index, post in posts:
+            post_dict = await slugify(post, username)
+            if post_dict["url"] in chunk:
+                errors.append({"index": index, "detail": "duplicate url"})
+            else:
+                chunk[post_dict["url"]] = index, post_dict
+
+        ids = await self.repo.add_many(
+            username,
+            [post_dict for _, post_dict in chunk.values()],
+        )
+        for url, (index, _) in chunk.items():
+            if url in ids:
+                created.append((index, ids[url]))
+            else:
+                errors.append({"index": index, "detail": "duplicate url"})
+        return created, errors
+
     async def get_post(self, username, post_id):
         post = await self.repo.get(username, post_id)
         if post is None:
             raise PostNotFoundError(post_id)
         return post
 
+    async def get_post_version(self, username, post_id):
+        version = await self.repo.version(username, post_id)
+        if version is None:
+            raise PostNotFoundError(post_id)
+        return version
+
     async def update_post(self, username, post_id, post):
         post_dict = await slugify(post, username)
         post = await self.repo.update(username, post_id, post_dict)
         if post is None:
             raise PostNotFoundError(post_id)
+        self._invalidate(post_id, self.page_cache)
         return post
 
     async def delete_post(self, username, post_id):
         deleted = await self.repo.delete(username, post_id)
         if deleted is False:
             raise PostNotFoundError(post_id)
+        self._invalidate(post_id, self.comment_cache, self.page_cache)
 
     async def get_post_by_post_url(self, username, post_slug):
-        user = await self.user_repo.get_by_username(username)
-        if user is None:
-            raise UserNotFoundError(username)
-
-        post = await self.repo.get_post_with_url(
-            username=user["username"],
-            url=f"/@{username}/{post_slug}",
-        )
-
+        post = await self.repo.get_post_with_url(f"/@{username}/{post_slug}")
         if post is None:
+            # only a missing post pays for telling the two 404s apart
+            if await self.user_repo.get_by_username(username) is None:
+                raise UserNotFoundError(username)
             raise PostNotFoundError(f"post: @{username}/{post_slug} is not found!")
-
         return post
 
     async def add_comment(self, username, post_id, comment):
-        # self.repo = None, self.comment_repo is available
-        if not await self.repo.exists(post_id):
-            raise PostNotFoundError(post_id)
-
-        return await self.comment_repo.add(
+        comment = await self.comment_repo.add(
             username,
             {"post_id": post_id, "parent_id": None, "comment": comment},
         )
+        if comment is None:
+            raise PostNotFoundError(post_id)
+        self._invalidate(post_id, self.comment_cache, self.page_cache)
+        return comment
@@ -3,20 +3,47 @@ from src.common.exceptions import (
     UnAuthorizedLoginError,
     DuplicateUsernameError,
 )
-from src.service import Service
-from src.web.core.security import verify_password
+from src.service import Service, decode_sort_cursor, sorted_page
+from src.web.core.schemas import Sort
+from src.web.core.security import password_hasher
 
 
 class UserService(Service):
-    async def get_user(self, user_id, full):
-        if full is False:
-            user = await self.repo.get(user_id)
-        else:
-            user = await self.repo.get_full(user_id)
+    cache = None
+    post_repo = None
+    draft_repo = None
+
+    async def get_user(self, user_id):
+        if self.cache is not None:
+            user = self.cache.get(user_id, None)
+            if user is not None:
+                return user
+
+        user = await self.repo.get(user_id)
         if user is None:
             raise UserNotFoundError(user_id)
+
+        # tagged by the id, so a profile change can drop it with `invalidate`
+        if self.cache is not None:
+            self.cache.set(user_id, user, tag=user_id)
         return user
 
+    async def get_profile(self, username, *, limit, posts_cursor, drafts_cursor):
+        """Return the user with a page of its posts and one of its drafts,
+        and the cursors of their next pages"""
+        user = await self.repo.get_full(
+            username,
+            limit=limit,
+            posts_after=decode_sort_cursor(posts_cursor, Sort.DATE),
+            drafts_after=decode_sort_cursor(drafts_cursor, Sort.DATE),
+        )
+        if user is None:
+            raise UserNotFoundError(username)
+
+        user["posts"], posts_cursor = sorted_page(user["posts"], limit, Sort.DATE)
+        user["drafts"], drafts_cursor = sorted_page(user["drafts"], limit, Sort.DATE)
+        return user, posts_cursor, drafts_cursor
+
     async def create_user(self, data: dict):
         user = await self.repo.add(data)
         if user is None:
@@ -30,7 +57,14 @@ class UserService(Service):
         user = await self.repo.get_by_username(username)
         if user is None:
             raise UnAuthorizedLoginError()
-        verify = verify_password(password, user["password"])
+        verify = await password_hasher.verify(password, user["password"])
         if not verify:
             raise UnAuthorizedLoginError()
         return user
+
+    async def export(self, username):
+        """Yield `("post", post)` and then `("draft", draft)` pairs of the user"""
+        async for post in self.post_repo.stream(username):
+            yield "post", post
+        async for draft in self.draft_repo.stream(username):
+            yield "draft", draft
@@ -1,3 +1,7 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
 import urlpath
 
 
@@ -16,3 +20,43 @@ def give_domain(domain, /, post_or_posts):
         return post
     post.url = str(urlpath.URL(domain) / post.url)
     return post
+
+
+def validators(last_modified: datetime, *version) -> dict[str, str]:
+    """Return the `ETag` and `Last-Modified` headers of a representation
+
+    `version` is whatever the representation changes with, e.g. the id and
+    the update time of a post. The tag is weak, since equal versions only
+    promise semantically equal JSON.
+    """
+    digest = hashlib.blake2b(repr(version).encode(), digest_size=8).hexdigest()
+    last_modified = last_modified.replace(tzinfo=timezone.utc, microsecond=0)
+    return {
+        "ETag": f'W/"{digest}"',
+        "Last-Modified": format_datetime(last_modified, usegmt=True),
+    }
+
+
+def not_modified(request, headers) -> bool:
+    """Tell if the conditional headers of the request match the validators
+
+    As in RFC 9110, `If-Modified-Since` is ignored when `If-None-Match`
+    is sent.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        etag = headers["ETag"].removeprefix("W/")
+        tags = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+        return any(tag in ("*", etag) for tag in tags)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        # a `-0000` zone is parsed as naive, but HTTP dates are all in UTC
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return parsedate_to_datetime(headers["Last-Modified"]) <= since
+    return False
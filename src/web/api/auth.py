@@ -3,30 +3,78 @@ from typing import Annotated
 from fastapi import APIRouter, Depends
 from fastapi.security import OAuth2PasswordRequestFormStrict
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import Request
+
+from src.common.exceptions import TooManyRequestsError, UnAuthorizedLoginError
 
 from src.repository.repos.user_repo import UserRepo
 from src.repository.unit_of_work import UnitOfWork
 from src.service.user_service import UserService
 from src.web.core.dependencies import get_db
+from src.web.core.ratelimit import (
+    login_client_username_limiter,
+    login_ip_limiter,
+    login_username_limiter,
+)
 from src.web.core.schemas import TokenSchema, UserLoginSchema
 from src.web.core.security import create_access_token
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
-@router.post("/access-token", response_model=TokenSchema)
+async def throttle_login(
+    request: Request,
+    form_data: Annotated[OAuth2PasswordRequestFormStrict, Depends()],
+) -> tuple:
+    """Refuse the attempts over the limits of the client and of the username,
+    before a password is hashed for them
+
+    Only the failed attempts are charged to the username, so its buckets are
+    only checked here. A client has a bucket of its own for each username,
+    so its failures can not lock out the user, while the larger bucket of
+    the username throttles guesses spread over many clients. Returns the
+    buckets to charge when the password is wrong.
+    """
+    host = request.client.host if request.client is not None else None
+    failure_buckets = (
+        (login_client_username_limiter, (form_data.username, host)),
+        (login_username_limiter, form_data.username),
+    )
+    for limiter, key in failure_buckets:
+        wait = await limiter.peek(key)
+        if wait:
+            raise TooManyRequestsError(wait)
+
+    wait = await login_ip_limiter.take(host)
+    if wait:
+        raise TooManyRequestsError(wait)
+    return failure_buckets
+
+
+@router.post(
+    "/access-token",
+    response_model=TokenSchema,
+)
 async def login_for_access_token(
     session: Annotated[AsyncSession, Depends(get_db)],
     form_data: Annotated[OAuth2PasswordRequestFormStrict, Depends()],
+    failure_buckets: Annotated[tuple, Depends(throttle_login)],
 ):
     async with UnitOfWork(session) as uow:
         repo = UserRepo(uow.session)
         service = UserService(repo)
-        user = await service.authenticate(
-            UserLoginSchema(
-                username=form_data.username,
-                password=form_data.password,
-            ).model_dump(),
+        try:
+            user = await service.authenticate(
+                UserLoginSchema(
+                    username=form_data.username,
+                    password=form_data.password,
+                ).model_dump(),
+            )
+        except UnAuthorizedLoginError:
+            for limiter, key in failure_buckets:
+                await limiter.take(key)
+            raise
+        access_token = create_access_token(
+            data={"sub": str(user["id"]), "username": user["username"]},
         )
-        access_token = create_access_token(data={"sub": str(user["id"])})
         return {"access_token": access_token, "token_type": "bearer"}
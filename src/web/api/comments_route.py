@@ -3,25 +3,63 @@ from typing import Annotated
 from fastapi import APIRouter, Depends, Query, Body
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
 
 from src.repository.repos.comment_repo import CommentRepo
 from src.repository.repos.post_repo import PostRepo
 from src.repository.unit_of_work import UnitOfWork
 from src.service.comment_service import CommentService
-from src.web.core.dependencies import get_db, get_current_user_simple
-from src.web.core.schemas import CommentSchema, ReplyLevel, UserInternalSchema
+from src.web.api import not_modified, validators
+from src.web.core.cache import comment_cache, post_page_cache
+from src.web.core.dependencies import (
+    get_db,
+    get_current_user_simple,
+    returning_cursor_parameters,
+    returning_expand_parameters,
+    CursorParameters,
+    ExpandParameters,
+)
+from src.web.core.schemas import (
+    CommentSchema,
+    ReplyLevel,
+    Shape,
+    UserInternalSchema,
+)
 
 router = APIRouter(prefix="/comments", tags=["comments"])
 
 
+def comments_validators(version):
+    """Every comment page of a post changes with the post's comments"""
+    last_modified = version["comments_updated"] or version["created"]
+    return validators(
+        last_modified,
+        version["id"],
+        last_modified,
+        version["all_comments_count"],
+    )
+
+
 @router.get(
     "/{post_id}/basecomments",
     response_model=list[CommentSchema],
+    response_model_exclude_unset=True,
     status_code=status.HTTP_200_OK,
 )
 async def get_base_comments(
     post_id: int,
+    request: Request,
+    response: Response,
     session: Annotated[AsyncSession, Depends(get_db)],
+    cursor_parameters: Annotated[
+        CursorParameters,
+        Depends(returning_cursor_parameters),
+    ],
+    expand_parameters: Annotated[
+        ExpandParameters,
+        Depends(returning_expand_parameters),
+    ],
     reply_level: Annotated[
         ReplyLevel,
         Query(
@@ -29,29 +67,94 @@ async def get_base_comments(
             description="how many nested replies should be returned",
         ),
     ] = ReplyLevel.BASE,
+    shape: Annotated[
+        Shape,
+        Query(description="a flat list or a tree of nested `children`"),
+    ] = Shape.FLAT,
 ):
     async with UnitOfWork(session) as uow:
         repo = CommentRepo(uow.session)
         post_repo = PostRepo(uow.session)
-        service = CommentService(repo, post_repo=post_repo)
-        comments = await service.get_comments(
+        service = CommentService(
+            repo,
+            post_repo=post_repo,
+            cache=comment_cache,
+            page_cache=post_page_cache,
+        )
+        comments, next_cursor, version = await service.get_comments(
             post_id=post_id,
             comment_id=0,
             reply_level=reply_level,
+            cursor=cursor_parameters.cursor,
+            limit=cursor_parameters.limit,
+            shape=shape,
+            depth=expand_parameters.depth,
+            per_node=expand_parameters.per_node,
+            not_modified=lambda version: not_modified(
+                request,
+                comments_validators(version),
+            ),
         )
+        headers = comments_validators(version)
+        if not_modified(request, headers):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        if next_cursor is not None:
+            response.headers["X-Next-Cursor"] = next_cursor
+        response.headers.update(headers)
         return comments
 
 
+@router.get(
+    "/{post_id}/export",
+    response_class=StreamingResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def export_comments(
+    post_id: int,
+    session: Annotated[AsyncSession, Depends(get_db)],
+):
+    """Stream every comment of a post as newline-delimited JSON"""
+    repo = CommentRepo(session)
+    post_repo = PostRepo(session)
+    service = CommentService(
+        repo,
+        post_repo=post_repo,
+        cache=comment_cache,
+        page_cache=post_page_cache,
+    )
+    comments = await service.export_comments(post_id=post_id)
+
+    async def ndjson():
+        async with UnitOfWork(session):
+            async for comment in comments:
+                comment = CommentSchema(**comment)
+                yield comment.model_dump_json(exclude_unset=True) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
 # TODO: write tests for PostNotFoundError
 @router.get(
     "/{post_id}/{comment_id}",
     response_model=list[CommentSchema],
+    response_model_exclude_unset=True,
     status_code=status.HTTP_200_OK,
 )
 async def get_replies(
     post_id: int,
     comment_id: int,
+    request: Request,
+    response: Response,
     session: Annotated[AsyncSession, Depends(get_db)],
+    cursor_parameters: Annotated[
+        CursorParameters,
+        Depends(returning_cursor_parameters),
+    ],
+    expand_parameters: Annotated[
+        ExpandParameters,
+        Depends(returning_expand_parameters),
+    ],
     reply_level: Annotated[
         ReplyLevel,
         Query(
@@ -59,22 +162,48 @@ async def get_replies(
             description="how many nested replies should be returned",
         ),
     ] = ReplyLevel.BASE,
+    shape: Annotated[
+        Shape,
+        Query(description="a flat list or a tree of nested `children`"),
+    ] = Shape.FLAT,
 ):
     async with UnitOfWork(session) as uow:
         repo = CommentRepo(uow.session)
         post_repo = PostRepo(uow.session)
-        service = CommentService(repo, post_repo=post_repo)
-        comments = await service.get_comments(
+        service = CommentService(
+            repo,
+            post_repo=post_repo,
+            cache=comment_cache,
+            page_cache=post_page_cache,
+        )
+        comments, next_cursor, version = await service.get_comments(
             post_id=post_id,
             comment_id=comment_id,
             reply_level=reply_level,
+            cursor=cursor_parameters.cursor,
+            limit=cursor_parameters.limit,
+            shape=shape,
+            depth=expand_parameters.depth,
+            per_node=expand_parameters.per_node,
+            not_modified=lambda version: not_modified(
+                request,
+                comments_validators(version),
+            ),
         )
+        headers = comments_validators(version)
+        if not_modified(request, headers):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        if next_cursor is not None:
+            response.headers["X-Next-Cursor"] = next_cursor
+        response.headers.update(headers)
         return comments
 
 
 @router.put(
     "/{post_id}/{comment_id}",
     response_model=CommentSchema,
+    response_model_exclude_unset=True,
     status_code=status.HTTP_200_OK,
 )
 async def update_comment(
@@ -87,7 +216,12 @@ async def update_comment(
     async with UnitOfWork(session) as uow:
         repo = CommentRepo(uow.session)
         post_repo = PostRepo(uow.session)
-        service = CommentService(repo, post_repo=post_repo)
+        service = CommentService(
+            repo,
+            post_repo=post_repo,
+            cache=comment_cache,
+            page_cache=post_page_cache,
+        )
         comment = await service.update_comment(
             username=user.username,
             post_id=post_id,
@@ -111,7 +245,12 @@ async def delete_comment(
     async with UnitOfWork(session) as uow:
         repo = CommentRepo(uow.session)
         post_repo = PostRepo(uow.session)
-        service = CommentService(repo, post_repo=post_repo)
+        service = CommentService(
+            repo,
+            post_repo=post_repo,
+            cache=comment_cache,
+            page_cache=post_page_cache,
+        )
         await service.delete_comment(
             username=user.username,
             post_id=post_id,
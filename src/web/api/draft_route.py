@@ -1,14 +1,15 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 from starlette.requests import Request
+from starlette.responses import Response
 
 from src.repository.repos.draft_repo import DraftRepo
 from src.repository.unit_of_work import UnitOfWork
 from src.service.draft_service import DraftService
-from src.web.api import give_domain
+from src.web.api import give_domain, not_modified, validators
 from src.web.core.dependencies import (
     get_current_user_simple,
     QueryParameters,
@@ -21,6 +22,7 @@ from src.web.core.schemas import (
     DraftSchema,
     PublishSchema,
     PostSchema,
+    Include,
 )
 
 router = APIRouter(prefix="/drafts", tags=["drafts"])
@@ -48,29 +50,41 @@ async def create_draft(
 @router.get(
     "/",
     response_model=list[DraftSchema],
+    response_model_exclude_unset=True,
     status_code=status.HTTP_200_OK,
 )
 async def get_drafts(
+    response: Response,
     session: Annotated[AsyncSession, Depends(get_db)],
     user: Annotated[UserInternalSchema, Depends(get_current_user_simple)],
     query_parameters: Annotated[QueryParameters, Depends(returning_query_parameters)],
+    include: Annotated[
+        list[Include] | None,
+        Query(description="fields left out of the list by default"),
+    ] = None,
 ):
-    """Retrieve all the draft"""
+    """Retrieve all the drafts, with their excerpts instead of their bodies"""
     async with UnitOfWork(session) as uow:
         repo = DraftRepo(uow.session)
         service = DraftService(repo)
-        drafts = await service.list_drafts(
+        drafts, next_cursor = await service.list_drafts(
             user,
             page=query_parameters.page,
             per_page=query_parameters.per_page,
             sort=query_parameters.sort,
             desc_=query_parameters.desc,
+            cursor=query_parameters.cursor,
+            include_body=Include.BODY in (include or ()),
         )
+        if next_cursor is not None:
+            response.headers["X-Next-Cursor"] = next_cursor
         return drafts
 
 
 @router.get("/{draft_id}", response_model=DraftSchema, status_code=status.HTTP_200_OK)
 async def get_draft(
+    request: Request,
+    response: Response,
     draft_id: int,
     session: Annotated[AsyncSession, Depends(get_db)],
     user: Annotated[UserInternalSchema, Depends(get_current_user_simple)],
@@ -79,7 +93,15 @@ async def get_draft(
     async with UnitOfWork(session) as uow:
         repo = DraftRepo(uow.session)
         service = DraftService(repo)
-        return await service.get_draft(user, draft_id)
+        version = await service.get_draft_version(user, draft_id)
+        last_modified = version["updated"] or version["created"]
+        headers = validators(last_modified, version["id"], last_modified)
+        if not_modified(request, headers):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        draft = await service.get_draft(user, draft_id)
+        response.headers.update(headers)
+        return draft
 
 
 @router.put("/{draft_id}", response_model=DraftSchema, status_code=status.HTTP_200_OK)
@@ -1,15 +1,21 @@
+import json
+from functools import partial
 from typing import Annotated
 
 from fastapi import APIRouter, Depends
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from starlette import status
 from starlette.requests import Request
+from starlette.responses import Response
 
 from src.repository.repos.post_repo import PostRepo
 from src.repository.repos.user_repo import UserRepo
 from src.repository.unit_of_work import UnitOfWork
 from src.service.post_service import PostService
-from src.web.api import give_domain
-from src.web.core.dependencies import get_db
+from src.web.api import give_domain, not_modified, validators
+from src.web.core.cache import post_page_cache, post_page_flight
+from src.web.core.dependencies import get_async_sessionmaker
 from src.web.core.schemas import GlobalPostSchema
 
 router = APIRouter(tags=["global posts"])
@@ -20,12 +26,68 @@ async def get_global_post(
     username: str,
     post_slug: str,
     request: Request,
-    session: Annotated[AsyncSession, Depends(get_db)],
+    asessionmaker: Annotated[async_sessionmaker, Depends(get_async_sessionmaker)],
 ):
-    async with UnitOfWork(session) as uow:
+    """Return the public view of a post
+
+    The view is cached per url as JSON bytes, concurrent misses of the same
+    url share a single query. It is cached without the domain, which comes
+    from the request's `Host` and so must not pick the entries of the
+    cache; the full url is spliced into the bytes on the way out.
+    """
+    key = (username, post_slug)
+    page = post_page_cache.get(key, None)
+    if page is None:
+        page = await post_page_flight.do(
+            key,
+            partial(render_global_post, asessionmaker, *key),
+        )
+
+    url, content, headers = page
+    if not_modified(request, headers):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    url = give_domain(str(request.base_url), {"url": url})["url"]
+    content = b'{"url":' + dumps(url) + b"," + content[1:]
+    return Response(content, media_type="application/json", headers=headers)
+
+
+def dumps(obj) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+async def render_global_post(asessionmaker, username, post_slug):
+    # taken before the query, so that a page read before a change of the
+    # post is not cached after the change has invalidated the post's pages
+    since = post_page_cache.generation()
+    # a session of its own, since the requests waiting on this call must
+    # not fail if the one which started it goes away
+    async with UnitOfWork(asessionmaker()) as uow:
         post_repo = PostRepo(uow.session)
         user_repo = UserRepo(uow.session)
         service = PostService(post_repo, user_repo=user_repo)
         post = await service.get_post_by_post_url(username, post_slug)
-        post = give_domain(str(request.base_url), post)
-        return post
+
+    # the page shows the comment counters, so it changes with the comments
+    last_modified = max(
+        post["updated"] or post["created"],
+        post["comments_updated"] or post["created"],
+    )
+    headers = validators(
+        last_modified,
+        post["id"],
+        last_modified,
+        post["all_comments_count"],
+        post["base_comments_count"],
+    )
+    content = dumps(
+        jsonable_encoder(
+            {
+                field: post[field]
+                for field in GlobalPostSchema.model_fields
+                if field != "url"
+            },
+        ),
+    )
+    page = post["url"], content, headers
+    post_page_cache.set((username, post_slug), page, tag=post["id"], since=since)
+    return page
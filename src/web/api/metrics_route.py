@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends, HTTPException
+from starlette import status
+
+from src.web.core.cache import caches
+from src.web.core.config import settings
+
+
+def metrics_exposed():
+    """Hide the metrics unless `expose_metrics` is set, since the sizes and
+    hit ratios of the caches help to tune a flood which evicts them"""
+    if not settings.expose_metrics:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["metrics"],
+    dependencies=[Depends(metrics_exposed)],
+)
+
+
+@router.get("/caches", status_code=status.HTTP_200_OK)
+async def get_cache_metrics():
+    """Hits, misses and size of every in-process cache, for sizing them"""
+    return {name: cache.stats() for name, cache in caches.items()}
@@ -1,16 +1,21 @@
+import json
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, Body
+from fastapi import APIRouter, Depends, Body, Query, HTTPException
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 from starlette.requests import Request
+from starlette.responses import Response
 
 from src.repository.repos.comment_repo import CommentRepo
 from src.repository.repos.post_repo import PostRepo
 from src.repository.unit_of_work import UnitOfWork
 from src.service.comment_service import CommentService
 from src.service.post_service import PostService
-from src.web.api import give_domain
+from src.web.api import give_domain, not_modified, validators
+from src.web.core.cache import comment_cache, post_page_cache
+from src.web.core.config import settings
 from src.web.core.dependencies import (
     get_db,
     get_current_user_simple,
@@ -19,10 +24,13 @@ from src.web.core.dependencies import (
 )
 from src.web.core.schemas import (
     CreatePostSchema,
+    BulkPostsSchema,
     PostSchema,
     UserInternalSchema,
     CommentSchema,
     UpdatePostSchema,
+    TagMatch,
+    Include,
 )
 
 router = APIRouter(prefix="/posts", tags=["posts"])
@@ -48,28 +56,138 @@ async def create_post(
         return give_domain(str(request.base_url), post)
 
 
+async def read_bulk_posts(request: Request):
+    """Yield the raw items of a JSON array or an NDJSON body
+
+    NDJSON is read line by line as it streams in, so a large import is never
+    held in memory as a whole. A line that is not valid JSON yields
+    `(index, None, error)`.
+    """
+    if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+        index, buffer = 0, b""
+        async for chunk in request.stream():
+            *lines, buffer = (buffer + chunk).split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield index, *_load_line(line)
+                    index += 1
+        if buffer.strip():
+            yield index, *_load_line(buffer)
+        return
+
+    try:
+        items = json.loads(await request.body())
+    except ValueError:
+        items = None
+    if not isinstance(items, list):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="expected a JSON array or NDJSON of posts",
+        )
+    for index, item in enumerate(items):
+        yield index, item, None
+
+
+def _load_line(line):
+    try:
+        return json.loads(line), None
+    except ValueError:
+        return None, "invalid JSON"
+
+
+@router.post(
+    "/bulk",
+    response_model=BulkPostsSchema,
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_posts(
+    request: Request,
+    session: Annotated[AsyncSession, Depends(get_db)],
+    user: Annotated[UserInternalSchema, Depends(get_current_user_simple)],
+):
+    """Create many posts from a JSON array or NDJSON of posts
+
+    The posts are inserted in chunks within one transaction; the invalid ones
+    are reported by their index and the rest are created.
+    """
+    created, errors, chunk = [], [], []
+    async with UnitOfWork(session) as uow:
+        repo = PostRepo(uow.session)
+        service = PostService(repo)
+
+        async def flush():
+            ids, failed = await service.import_posts(user.username, chunk)
+            created.extend(ids)
+            errors.extend(failed)
+            chunk.clear()
+
+        async for index, item, error in read_bulk_posts(request):
+            if error is not None:
+                errors.append({"index": index, "detail": error})
+                continue
+            try:
+                chunk.append((index, CreatePostSchema.model_validate(item)))
+            except ValidationError as exc:
+                errors.append(
+                    {
+                        "index": index,
+                        "detail": exc.errors(include_url=False, include_context=False),
+                    },
+                )
+            if len(chunk) == settings.bulk_import_chunk_size:
+                await flush()
+        if chunk:
+            await flush()
+        await uow.commit()
+
+    return {
+        "created": [post_id for _, post_id in sorted(created)],
+        "errors": sorted(errors, key=lambda error: error["index"]),
+    }
+
+
 @router.get(
     "/",
     response_model=list[PostSchema],
+    response_model_exclude_unset=True,
     status_code=status.HTTP_200_OK,
 )
 async def get_posts(
     request: Request,
+    response: Response,
     session: Annotated[AsyncSession, Depends(get_db)],
     user: Annotated[UserInternalSchema, Depends(get_current_user_simple)],
     query_parameters: Annotated[QueryParameters, Depends(returning_query_parameters)],
+    tag: Annotated[
+        list[str] | None,
+        Query(description="only the posts with these tags"),
+    ] = None,
+    match: Annotated[
+        TagMatch,
+        Query(description="whether the posts must have all or any of the tags"),
+    ] = TagMatch.ALL,
+    include: Annotated[
+        list[Include] | None,
+        Query(description="fields left out of the list by default"),
+    ] = None,
 ):
-    """Retrieve all the posts"""
+    """Retrieve all the posts, with their excerpts instead of their bodies"""
     async with UnitOfWork(session) as uow:
         repo = PostRepo(uow.session)
         service = PostService(repo)
-        posts = await service.list_posts(
+        posts, next_cursor = await service.list_posts(
             user.username,
             page=query_parameters.page,
             per_page=query_parameters.per_page,
             sort=query_parameters.sort,
             desc_=query_parameters.desc,
+            cursor=query_parameters.cursor,
+            tags=tag,
+            match=match,
+            include_body=Include.BODY in (include or ()),
         )
+        if next_cursor is not None:
+            response.headers["X-Next-Cursor"] = next_cursor
         posts = give_domain(str(request.base_url), posts)
         return posts
 
@@ -77,6 +195,7 @@ async def get_posts(
 @router.get("/{post_id}", response_model=PostSchema, status_code=status.HTTP_200_OK)
 async def get_post(
     request: Request,
+    response: Response,
     post_id: int,
     session: Annotated[AsyncSession, Depends(get_db)],
     user: Annotated[UserInternalSchema, Depends(get_current_user_simple)],
@@ -85,8 +204,15 @@ async def get_post(
     async with UnitOfWork(session) as uow:
         repo = PostRepo(uow.session)
         service = PostService(repo)
+        version = await service.get_post_version(user.username, post_id)
+        last_modified = version["updated"] or version["created"]
+        headers = validators(last_modified, version["id"], last_modified)
+        if not_modified(request, headers):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
         post = await service.get_post(user.username, post_id)
         payload = give_domain(str(request.base_url), post)
+        response.headers.update(headers)
         return payload
 
 
@@ -105,7 +231,10 @@ async def update_post(
     """Updating a post"""
     async with UnitOfWork(session) as uow:
         repo = PostRepo(uow.session)
-        service = PostService(repo)
+        service = PostService(
+            repo,
+            page_cache=post_page_cache,
+        )
         post = await service.update_post(user.username, post_id, post)
         await uow.commit()
         return give_domain(str(request.base_url), post)
@@ -120,7 +249,11 @@ async def delete_post(
     """Delete a specific post"""
     async with UnitOfWork(session) as uow:
         repo = PostRepo(uow.session)
-        service = PostService(repo)
+        service = PostService(
+            repo,
+            comment_cache=comment_cache,
+            page_cache=post_page_cache,
+        )
         await service.delete_post(user.username, post_id)
         await uow.commit()
 
@@ -129,6 +262,7 @@ async def delete_post(
     "/{post_id}/comment",
     status_code=status.HTTP_201_CREATED,
     response_model=CommentSchema,
+    response_model_exclude_unset=True,
 )
 async def add_comment(
     post_id: int,
@@ -139,7 +273,12 @@ async def add_comment(
     async with UnitOfWork(session) as uow:
         repo = PostRepo(uow.session)
         comment_repo = CommentRepo(uow.session)
-        service = PostService(repo=repo, comment_repo=comment_repo)
+        service = PostService(
+            repo=repo,
+            comment_repo=comment_repo,
+            comment_cache=comment_cache,
+            page_cache=post_page_cache,
+        )
         comment = await service.add_comment(user.username, post_id, comment)
         await uow.commit()
         return comment
@@ -149,6 +288,7 @@ async def add_comment(
     "/{post_id}/comment/{comment_id}",
     status_code=status.HTTP_201_CREATED,
     response_model=CommentSchema,
+    response_model_exclude_unset=True,
 )
 async def add_reply(
     post_id: int,
@@ -160,7 +300,12 @@ async def add_reply(
     async with UnitOfWork(session) as uow:
         repo = CommentRepo(uow.session)
         post_repo = PostRepo(uow.session)
-        service = CommentService(repo, post_repo=post_repo)
+        service = CommentService(
+            repo,
+            post_repo=post_repo,
+            cache=comment_cache,
+            page_cache=post_page_cache,
+        )
         comment = await service.reply(
             username=user.username,
             post_id=post_id,
@@ -0,0 +1,57 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+from starlette.requests import Request
+from starlette.responses import Response
+
+from src.repository.repos.post_repo import PostRepo
+from src.repository.unit_of_work import UnitOfWork
+from src.service.post_service import PostService
+from src.web.api import give_domain
+from src.web.core.dependencies import (
+    get_db,
+    returning_cursor_parameters,
+    CursorParameters,
+)
+from src.web.core.schemas import SearchResultSchema
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+
+@router.get(
+    "/",
+    response_model=list[SearchResultSchema],
+    status_code=status.HTTP_200_OK,
+)
+async def search_posts(
+    request: Request,
+    response: Response,
+    q: Annotated[
+        str,
+        Query(
+            description='words to search for, supports "quoted phrases", '
+            "`or` and `-excluded` words",
+            min_length=1,
+            max_length=255,
+        ),
+    ],
+    session: Annotated[AsyncSession, Depends(get_db)],
+    cursor_parameters: Annotated[
+        CursorParameters,
+        Depends(returning_cursor_parameters),
+    ],
+):
+    """Search the titles and bodies of all the posts, best matches first"""
+    async with UnitOfWork(session) as uow:
+        repo = PostRepo(uow.session)
+        service = PostService(repo)
+        posts, next_cursor = await service.search_posts(
+            q,
+            cursor=cursor_parameters.cursor,
+            limit=cursor_parameters.limit,
+        )
+        if next_cursor is not None:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return give_domain(str(request.base_url), posts)
@@ -0,0 +1,49 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+from starlette.requests import Request
+from starlette.responses import Response
+
+from src.repository.repos.post_repo import PostRepo
+from src.repository.unit_of_work import UnitOfWork
+from src.service.post_service import PostService
+from src.web.api import give_domain
+from src.web.core.dependencies import (
+    get_db,
+    returning_cursor_parameters,
+    CursorParameters,
+)
+from src.web.core.schemas import PostSchema
+
+router = APIRouter(prefix="/tags", tags=["tags"])
+
+
+@router.get(
+    "/{name}/posts",
+    response_model=list[PostSchema],
+    status_code=status.HTTP_200_OK,
+)
+async def get_tagged_posts(
+    name: str,
+    request: Request,
+    response: Response,
+    session: Annotated[AsyncSession, Depends(get_db)],
+    cursor_parameters: Annotated[
+        CursorParameters,
+        Depends(returning_cursor_parameters),
+    ],
+):
+    """Retrieve the newest posts of every user with a tag"""
+    async with UnitOfWork(session) as uow:
+        repo = PostRepo(uow.session)
+        service = PostService(repo)
+        posts, next_cursor = await service.list_tagged_posts(
+            name,
+            cursor=cursor_parameters.cursor,
+            limit=cursor_parameters.limit,
+        )
+        if next_cursor is not None:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return give_domain(str(request.base_url), posts)
@@ -1,16 +1,29 @@
+import json
 from typing import Annotated
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
 
+from src.repository.repos.draft_repo import DraftRepo
+from src.repository.repos.post_repo import PostRepo
 from src.repository.repos.user_repo import UserRepo
 from src.repository.unit_of_work import UnitOfWork
 from src.service.user_service import UserService
 from src.web.api import give_domain
-from src.web.core.dependencies import get_db, get_current_user_full
-from src.web.core.schemas import UserOutSchema, UserSignUpSchema, UserInternalSchema
+from src.web.core.dependencies import (
+    get_db,
+    get_current_user_simple,
+)
+from src.web.core.schemas import (
+    UserOutSchema,
+    UserSignUpSchema,
+    UserInternalSchema,
+    PostSchema,
+    DraftSchema,
+)
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -35,7 +48,78 @@ async def signup_user(
 @router.get("/me", response_model=UserOutSchema)
 async def read_users_me(
     request: Request,
-    current_user: Annotated[UserInternalSchema, Depends(get_current_user_full)],
+    response: Response,
+    session: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[UserInternalSchema, Depends(get_current_user_simple)],
+    limit: Annotated[
+        int,
+        Query(description="maximum number of posts and of drafts", ge=1, le=100),
+    ] = 20,
+    posts_cursor: Annotated[
+        str | None,
+        Query(
+            alias="posts-cursor",
+            description="the `X-Next-Posts-Cursor` header of the previous page",
+        ),
+    ] = None,
+    drafts_cursor: Annotated[
+        str | None,
+        Query(
+            alias="drafts-cursor",
+            description="the `X-Next-Drafts-Cursor` header of the previous page",
+        ),
+    ] = None,
 ):
-    current_user["posts"] = give_domain(str(request.base_url), current_user["posts"])
-    return current_user
+    """Return the user with its newest posts and drafts, a page of each"""
+    async with UnitOfWork(session) as uow:
+        repo = UserRepo(uow.session)
+        service = UserService(repo)
+        user, posts_cursor, drafts_cursor = await service.get_profile(
+            current_user.username,
+            limit=limit,
+            posts_cursor=posts_cursor,
+            drafts_cursor=drafts_cursor,
+        )
+    if posts_cursor is not None:
+        response.headers["X-Next-Posts-Cursor"] = posts_cursor
+    if drafts_cursor is not None:
+        response.headers["X-Next-Drafts-Cursor"] = drafts_cursor
+    user["posts"] = give_domain(str(request.base_url), user["posts"])
+    return user
+
+
+@router.get(
+    "/me/export",
+    response_class=StreamingResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def export_users_me(
+    request: Request,
+    session: Annotated[AsyncSession, Depends(get_db)],
+    current_user: Annotated[UserInternalSchema, Depends(get_current_user_simple)],
+):
+    """Stream every post and draft of the user as newline-delimited JSON
+
+    Each line is a post or a draft with a `type` of `"post"` or `"draft"`.
+    """
+    service = UserService(
+        UserRepo(session),
+        post_repo=PostRepo(session),
+        draft_repo=DraftRepo(session),
+    )
+    schemas = {"post": PostSchema, "draft": DraftSchema}
+    domain = str(request.base_url)
+
+    async def ndjson():
+        async with UnitOfWork(session):
+            async for type_, row in service.export(current_user.username):
+                if type_ == "post":
+                    row = give_domain(domain, row)
+                row = schemas[type_](**row).model_dump(mode="json")
+                yield json.dumps({"type": type_, **row}) + "\n"
+
+    return StreamingResponse(
+        ndjson(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="export.ndjson"'},
+    )
@@ -1,3 +1,6 @@
+import math
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from starlette import status
 from starlette.responses import JSONResponse
@@ -6,6 +9,9 @@ from src.common.exceptions import (
     ResourceNotFoundError,
     DuplicateUsernameError,
     UnAuthorizedError,
+    InvalidCursorError,
+    PasswordHasherBusyError,
+    TooManyRequestsError,
 )
 from src.web.api import (
     post_route,
@@ -14,9 +20,20 @@ from src.web.api import (
     draft_route,
     global_route,
     comments_route,
+    metrics_route,
+    tag_route,
+    search_route,
 )
+from src.web.core.security import password_hasher
+
+
+@asynccontextmanager
+async def lifespan(_):
+    yield
+    password_hasher.shutdown()
 
-app = FastAPI(debug=True)
+
+app = FastAPI(debug=True, lifespan=lifespan)
 
 app.include_router(user_route.router)
 app.include_router(auth.router)
@@ -24,6 +41,9 @@ app.include_router(post_route.router)
 app.include_router(draft_route.router)
 app.include_router(global_route.router)
 app.include_router(comments_route.router)
+app.include_router(tag_route.router)
+app.include_router(search_route.router)
+app.include_router(metrics_route.router)
 
 
 @app.exception_handler(ResourceNotFoundError)
@@ -42,6 +62,32 @@ async def duplicate_username_exception_handler(_, exc: DuplicateUsernameError):
     )
 
 
+@app.exception_handler(InvalidCursorError)
+async def invalid_cursor_exception_handler(_, exc: InvalidCursorError):
+    return JSONResponse(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        content={"detail": exc.__str__()},
+    )
+
+
+@app.exception_handler(PasswordHasherBusyError)
+async def password_hasher_busy_exception_handler(*_):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Too many signups and logins, try again shortly"},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.exception_handler(TooManyRequestsError)
+async def too_many_requests_exception_handler(_, exc: TooManyRequestsError):
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={"detail": "Too many login attempts, try again later"},
+        headers={"Retry-After": str(math.ceil(exc.retry_after))},
+    )
+
+
 @app.exception_handler(UnAuthorizedError)
 async def unauthorized_exception_handle(*_):
     return JSONResponse(
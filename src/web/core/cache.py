@@ -0,0 +1,31 @@
+from src.common.cache import LRUCache, SingleFlight
+from src.web.core.config import settings
+
+comment_cache = LRUCache(
+    maxsize=settings.comment_cache_maxsize,
+    ttl=settings.comment_cache_ttl,
+)
+# the serialized public views of posts, refilled one request at a time
+post_page_cache = LRUCache(
+    maxsize=settings.post_page_cache_maxsize,
+    ttl=settings.post_page_cache_ttl,
+)
+post_page_flight = SingleFlight()
+# the claims of verified access tokens, by the digest of the token
+token_cache = LRUCache(
+    maxsize=settings.token_cache_maxsize,
+    ttl=settings.token_cache_ttl,
+)
+# the authenticated users, by their id
+user_cache = LRUCache(
+    maxsize=settings.user_cache_maxsize,
+    ttl=settings.user_cache_ttl,
+)
+
+# every cache of the app, by the name its metrics are exposed with
+caches = {
+    "comments": comment_cache,
+    "post_pages": post_page_cache,
+    "tokens": token_cache,
+    "users": user_cache,
+}
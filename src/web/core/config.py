@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic import PostgresDsn
 from pydantic_settings import BaseSettings
 
@@ -7,6 +9,32 @@ class Settings(BaseSettings):
     secret_key: str
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 1 * 24 * 60  # one day
+    comment_cache_maxsize: int = 10_000
+    comment_cache_ttl: float = 30  # seconds
+    post_page_cache_maxsize: int = 10_000
+    post_page_cache_ttl: float = 30  # seconds
+    token_cache_maxsize: int = 100_000
+    token_cache_ttl: float = 15 * 60  # seconds, shortened to the token's `exp`
+    user_cache_maxsize: int = 10_000
+    user_cache_ttl: float = 60  # seconds
+    # trust the username signed into the token, authorizing with no query
+    user_from_token_claims: bool = False
+    # login attempts: `rate` tokens a second, up to `burst` at once; only the
+    # failed ones are charged to the username limits
+    login_ip_rate: float = 1.0
+    login_ip_burst: int = 20
+    login_username_rate: float = 1 / 3  # twenty a minute, from all clients
+    login_username_burst: int = 20
+    login_client_username_rate: float = 1 / 12  # five a minute
+    login_client_username_burst: int = 5
+    login_limiter_maxsize: int = 100_000  # buckets kept by each limiter
+    bulk_import_chunk_size: int = 1000  # posts per INSERT
+    password_hash_executor: Literal["thread", "process"] = "thread"
+    password_hash_workers: int = 4
+    # hashes waiting for a worker, beyond which signups and logins get a 503
+    password_hash_queue_size: int = 64
+    # serve /metrics, which should only be reachable from inside the network
+    expose_metrics: bool = False
 
 
 settings = Settings()
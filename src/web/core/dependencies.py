@@ -3,16 +3,19 @@ from typing import Annotated
 
 from fastapi import Depends, HTTPException, Query
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError  # noqa
+from jose import JWTError
 from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
 from starlette import status
 
 from src.repository.repos.user_repo import UserRepo
 from src.repository.unit_of_work import UnitOfWork
+from src.service.objects import User
 from src.service.user_service import UserService
+from src.web.core.cache import user_cache
 from src.web.core.config import settings
 from src.web.core.database import sqlalchemy_engine
 from src.web.core.schemas import Sort
+from src.web.core.security import decode_access_token
 
 
 async def get_async_sessionmaker() -> async_sessionmaker:
@@ -31,7 +34,7 @@ async def get_db(
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/access-token")
 
-QueryParameters = namedtuple("QueryParameters", "page per_page sort desc")
+QueryParameters = namedtuple("QueryParameters", "page per_page sort desc cursor")
 
 
 async def returning_query_parameters(
@@ -56,64 +59,91 @@ async def returning_query_parameters(
         bool,
         Query(description="order of the sorted posts"),
     ] = True,
+    cursor: Annotated[
+        str | None,
+        Query(
+            description="the `X-Next-Cursor` header of the previous page, "
+            "used instead of `page`",
+        ),
+    ] = None,
+):
+    return QueryParameters(page, per_page, sort, desc, cursor)
+
+
+CursorParameters = namedtuple("CursorParameters", "cursor limit")
+
+
+async def returning_cursor_parameters(
+    cursor: Annotated[
+        str | None,
+        Query(description="the `X-Next-Cursor` header of the previous page"),
+    ] = None,
+    limit: Annotated[
+        int,
+        Query(description="maximum number of items in the page", ge=1, le=100),
+    ] = 50,
+):
+    return CursorParameters(cursor, limit)
+
+
+ExpandParameters = namedtuple("ExpandParameters", "depth per_node")
+
+
+async def returning_expand_parameters(
+    depth: Annotated[
+        int | None,
+        Query(
+            description="expand the replies down to this depth, "
+            "instead of `reply-level`",
+            ge=0,
+            le=32,
+        ),
+    ] = None,
+    per_node: Annotated[
+        int,
+        Query(
+            alias="per-node",
+            description="maximum number of replies returned for each comment",
+            ge=1,
+            le=50,
+        ),
+    ] = 5,
 ):
-    return QueryParameters(page, per_page, sort, desc)
+    return ExpandParameters(depth, per_node)
 
 
 async def get_user(
     session: Annotated[AsyncSession, Depends(get_db)],
     user_id,
-    full=False,
 ):
     async with UnitOfWork(session) as uow:
         repo = UserRepo(uow.session)
-        service = UserService(repo)
-        return await service.get_user(user_id, full)
+        service = UserService(repo, cache=user_cache)
+        return await service.get_user(user_id)
 
 
-async def get_current_user_simple(
-    session: Annotated[AsyncSession, Depends(get_db)],
-    token: Annotated[str, Depends(oauth2_scheme)],
-):
+async def get_token_claims(token: Annotated[str, Depends(oauth2_scheme)]) -> dict:
+    """Verify the access token and return its claims, with a `sub`"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(
-            token=token,
-            key=settings.secret_key,
-            algorithms=[settings.algorithm],
-        )
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
+        claims = decode_access_token(token)
     except JWTError:
         raise credentials_exception
-    user = await get_user(session, int(user_id))
-    return user
+    if claims.get("sub") is None:
+        raise credentials_exception
+    return claims
 
 
-async def get_current_user_full(
+async def get_current_user_simple(
     session: Annotated[AsyncSession, Depends(get_db)],
-    token: Annotated[str, Depends(oauth2_scheme)],
+    claims: Annotated[dict, Depends(get_token_claims)],
 ):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    try:
-        payload = jwt.decode(
-            token=token,
-            key=settings.secret_key,
-            algorithms=[settings.algorithm],
-        )
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    user = await get_user(session, int(user_id), full=True)
+    user_id = int(claims["sub"])
+    if settings.user_from_token_claims and "username" in claims:
+        return User(id=user_id, username=claims["username"])
+    user = await get_user(session, user_id)
     return user
@@ -0,0 +1,27 @@
+from src.common.ratelimit import MemoryRateLimitBackend
+from src.web.core.config import settings
+
+# the login attempts by the client's address, and the failed ones by the
+# username tried, from every client and from each client on its own
+login_ip_limiter = MemoryRateLimitBackend(
+    rate=settings.login_ip_rate,
+    burst=settings.login_ip_burst,
+    maxsize=settings.login_limiter_maxsize,
+)
+login_username_limiter = MemoryRateLimitBackend(
+    rate=settings.login_username_rate,
+    burst=settings.login_username_burst,
+    maxsize=settings.login_limiter_maxsize,
+)
+login_client_username_limiter = MemoryRateLimitBackend(
+    rate=settings.login_client_username_rate,
+    burst=settings.login_client_username_burst,
+    maxsize=settings.login_limiter_maxsize,
+)
+
+# every rate limiter of the app
+limiters = {
+    "login_ip": login_ip_limiter,
+    "login_username": login_username_limiter,
+    "login_client_username": login_client_username_limiter,
+}
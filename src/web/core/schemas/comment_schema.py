@@ -12,3 +12,12 @@ class CommentSchema(BaseModel):
     path: str | None
     username: str
     reply_count: int
+    children_count: int
+
+    # only set when the replies are expanded with `depth`, it is the number
+    # of the replies of the comment that are not in the response
+    remaining_children: int | None = None
+
+    # only set in the `tree` shape of the comment lists, the routes
+    # returning comments leave it out of the response when it is unset
+    children: list["CommentSchema"] | None = None
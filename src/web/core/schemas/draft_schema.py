@@ -16,7 +16,9 @@ class DraftSchema(BaseModel):
     created: datetime
     updated: datetime | None = None
     title: constr(strip_whitespace=True, min_length=1)
-    body: constr(strip_whitespace=True, min_length=1)
+    # left out of the lists, unless they are asked for with `?include=body`
+    body: constr(strip_whitespace=True, min_length=1) | None = None
+    excerpt: str | None = None
 
 
 class MiniDraftSchema(BaseModel):
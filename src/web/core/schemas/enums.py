@@ -11,3 +11,17 @@ class ReplyLevel(Enum):
     ONE = "1"
     TWO = "2"
     THREE = "3"
+
+
+class Shape(Enum):
+    FLAT = "flat"
+    TREE = "tree"
+
+
+class TagMatch(Enum):
+    ALL = "all"
+    ANY = "any"
+
+
+class Include(Enum):
+    BODY = "body"
@@ -57,7 +57,9 @@ class PostSchema(BaseModel):
     created: datetime
     updated: datetime | None = None
     title: constr(strip_whitespace=True, min_length=1)
-    body: constr(strip_whitespace=True, min_length=1)
+    # left out of the lists, unless they are asked for with `?include=body`
+    body: constr(strip_whitespace=True, min_length=1) | None = None
+    excerpt: str | None = None
     username: str
 
     # the pattern for posts' url is like this: https://fastblog.io/@username/slugged-title-somehash
@@ -76,3 +78,23 @@ class GlobalPostSchema(PostSchema):
     all_comments_count: int
     base_comments_count: int
     reply_comments_count: int
+
+
+class SearchResultSchema(MiniPostSchema):
+    id: int
+    username: str
+    rank: float
+    # fragments of the body with the matched words wrapped in <b></b>
+    snippet: str
+
+
+class BulkPostErrorSchema(BaseModel):
+    # position of the post in the request body
+    index: int
+    detail: str | list
+
+
+class BulkPostsSchema(BaseModel):
+    # ids of the created posts, in the order they were sent
+    created: list[int]
+    errors: list[BulkPostErrorSchema]
@@ -1,8 +1,14 @@
+import asyncio
+import hashlib
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
 
 from jose import jwt
 from passlib.context import CryptContext
 
+from src.common.exceptions import PasswordHasherBusyError
+from src.web.core.cache import token_cache
 from src.web.core.config import settings
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -16,9 +22,95 @@ def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 
+class PasswordHasher:
+    """Run bcrypt in a pool of workers, off the event loop
+
+    A bcrypt round takes a few hundred milliseconds of CPU, which would
+    stall every other request of the worker if it ran on the loop. At most
+    `workers + queue_size` hashes are in flight; beyond that the call fails
+    fast with `PasswordHasherBusyError` instead of queueing without bound.
+    bcrypt releases the GIL, so threads run in parallel too.
+    """
+
+    def __init__(self, *, executor: str, workers: int, queue_size: int):
+        self.executor_type = executor
+        self.workers = workers
+        self.max_pending = workers + queue_size
+        self.pending = 0
+        self._executor: Executor | None = None
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    self.workers,
+                    thread_name_prefix="bcrypt",
+                )
+        return self._executor
+
+    async def _run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            raise PasswordHasherBusyError()
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, fn, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    executor=settings.password_hash_executor,
+    workers=settings.password_hash_workers,
+    queue_size=settings.password_hash_queue_size,
+)
+
+
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=settings.access_token_expire_minutes)
     to_encode["exp"] = expire
     encoded_jwt = jwt.encode(to_encode, key=settings.secret_key)
     return encoded_jwt
+
+
+def decode_access_token(token: str) -> dict:
+    """Return the claims of a valid access token, or raise `JWTError`
+
+    Clients resend the same token on every request, so the claims of a
+    verified token are cached by its digest until the token expires, and
+    its signature is checked once. The entries are tagged by the integer
+    user id in `sub`, as in `user_cache`, so
+    `token_cache.invalidate(user_id)` revokes every token of a user.
+    """
+    digest = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    claims = token_cache.get(digest, None)
+    if claims is not None:
+        return claims
+
+    claims = jwt.decode(
+        token=token,
+        key=settings.secret_key,
+        algorithms=[settings.algorithm],
+    )
+    ttl = None
+    if "exp" in claims:
+        ttl = min(claims["exp"] - time.time(), token_cache.ttl)
+    sub = claims.get("sub")
+    tag = int(sub) if isinstance(sub, str) and sub.isdigit() else None
+    token_cache.set(digest, claims, tag=tag, ttl=ttl)
+    return claims
@@ -10,8 +10,10 @@ from starlette.testclient import TestClient
 sys.path.append(str(pathlib.Path(__file__).parent.parent))
 from src.repository.models import Base  # noqa: E402
 from src.web.app import app  # noqa: E402
+from src.web.core.cache import caches  # noqa: E402
 from src.web.core.config import settings  # noqa: E402
 from src.web.core.dependencies import get_async_sessionmaker  # noqa: E402
+from src.web.core.ratelimit import limiters  # noqa: E402
 
 
 async def get_async_sessionmaker_mock():
@@ -27,6 +29,7 @@ async def get_async_sessionmaker_mock():
 
 
 app.dependency_overrides[get_async_sessionmaker] = get_async_sessionmaker_mock
+settings.expose_metrics = True
 
 
 @pytest.fixture(scope="function")
@@ -72,6 +75,10 @@ engine = create_async_engine(str(settings.database_url), poolclass=NullPool)
 async def drop_all():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
+    for cache in caches.values():
+        cache.clear()
+    for limiter in limiters.values():
+        limiter.clear()
 
 
 @pytest.fixture(scope="function")
@@ -1,5 +1,7 @@
 import random
 
+from src.web.core.config import settings
+
 
 class TestPostsNotFound:
     def test_get_post(self, class_client, class_headers):
@@ -89,6 +91,25 @@ class TestCommentsNotFound:
         assert response.status_code == 404, response.text
         assert "comment" in response.text.lower()
 
+    def test_add_reply_on_other_post(self, client, headers, payload):
+        post_id = client.post("/posts", headers=headers, json=payload).json()["id"]
+        other_post_id = client.post("/posts", headers=headers, json=payload).json()[
+            "id"
+        ]
+        comment_id = client.post(
+            f"/posts/{other_post_id}/comment",
+            json="comment",
+            headers=headers,
+        ).json()["id"]
+
+        response = client.post(
+            f"/posts/{post_id}/comment/{comment_id}",
+            json="reply",
+            headers=headers,
+        )
+        assert response.status_code == 404, response.text
+        assert "comment" in response.text.lower()
+
     def test_get_base_comment(self, class_client, class_headers):
         response = class_client.get("/comments/10/basecomments")
         assert response.status_code == 404, response.text
@@ -129,3 +150,9 @@ class TestCommentsNotFound:
         )
         assert response.status_code == 404, response.text
         assert "comment" in response.text.lower()
+
+
+def test_metrics_hidden(client, monkeypatch):
+    monkeypatch.setattr(settings, "expose_metrics", False)
+    response = client.get("/metrics/caches")
+    assert response.status_code == 404, response.text
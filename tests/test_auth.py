@@ -1,3 +1,12 @@
+from starlette.testclient import TestClient
+
+from src.web.app import app
+from src.web.core.cache import token_cache
+from src.web.core.config import settings
+from src.web.core.ratelimit import login_username_limiter
+from src.web.core.security import password_hasher, decode_access_token
+
+
 class TestAuth:
     username = "string"
     password = "12345678"
@@ -34,3 +43,125 @@ class TestAuth:
             },
         )
         assert response.status_code == 401, response.text
+
+
+def test_access_token_busy(client, headers, monkeypatch):
+    monkeypatch.setattr(password_hasher, "max_pending", 0)
+    response = client.post(
+        "/auth/access-token",
+        data={"username": "string", "password": "password", "grant_type": "password"},
+    )
+    assert response.status_code == 503, response.text
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_current_user_cached(client, headers):
+    client.get("/posts", headers=headers)
+    client.get("/drafts", headers=headers)
+    metrics = client.get("/metrics/caches").json()["users"]
+    assert metrics["hits"] >= 1
+    assert metrics["size"] == 1
+
+
+def test_current_user_from_token_claims(client, headers, monkeypatch):
+    monkeypatch.setattr(settings, "user_from_token_claims", True)
+    response = client.get("/posts", headers=headers)
+    assert response.status_code == 200, response.text
+    assert client.get("/metrics/caches").json()["users"]["size"] == 0
+
+
+def test_access_token_claims_cached(client, headers):
+    client.get("/posts", headers=headers)
+    client.get("/posts", headers=headers)
+    metrics = client.get("/metrics/caches").json()["tokens"]
+    assert metrics["hits"] >= 1
+    assert metrics["size"] == 1
+
+    token = headers["Authorization"].removeprefix("Bearer ")
+    claims = decode_access_token(token)
+    token_cache.invalidate(int(claims["sub"]))
+    assert client.get("/metrics/caches").json()["tokens"]["size"] == 0
+
+    forged = {"Authorization": f"Bearer {token[:-2]}xx"}
+    response = client.get("/posts", headers=forged)
+    assert response.status_code == 401, response.text
+
+
+def test_access_token_throttled(client, headers, headers2, monkeypatch):
+    data = {
+        "username": "string",
+        "password": "wrong-password",
+        "grant_type": "password",
+    }
+    for _ in range(settings.login_client_username_burst):
+        response = client.post("/auth/access-token", data=data)
+        assert response.status_code == 401, response.text
+
+    # refused before the password is hashed
+    monkeypatch.setattr(password_hasher, "max_pending", 0)
+    response = client.post("/auth/access-token", data=data)
+    assert response.status_code == 429, response.text
+    assert int(response.headers["Retry-After"]) >= 1
+
+    # other usernames have their own buckets
+    response = client.post("/auth/access-token", data={**data, "username": "mahdi"})
+    assert response.status_code == 503, response.text
+
+
+def client_from(host):
+    """Return a test client whose requests come from the address `host`"""
+
+    async def app_from_host(scope, receive, send):
+        scope["client"] = (host, 40000)
+        await app(scope, receive, send)
+
+    return TestClient(app=app_from_host)
+
+
+def test_access_token_not_locked_out(client, headers):
+    data = {
+        "username": "string",
+        "password": "wrong-password",
+        "grant_type": "password",
+    }
+    attacker_client = client_from("203.0.113.7")
+    for _ in range(settings.login_client_username_burst):
+        response = attacker_client.post("/auth/access-token", data=data)
+        assert response.status_code == 401, response.text
+    response = attacker_client.post("/auth/access-token", data=data)
+    assert response.status_code == 429, response.text
+
+    # the failures of another client are not charged to the user's own
+    for _ in range(settings.login_client_username_burst + 1):
+        response = client.post(
+            "/auth/access-token",
+            data={**data, "password": "password"},
+        )
+        assert response.status_code == 200, response.text
+
+
+def test_access_token_throttled_across_clients(client, headers, headers2, monkeypatch):
+    monkeypatch.setattr(login_username_limiter, "burst", 6)
+    data = {
+        "username": "string",
+        "password": "wrong-password",
+        "grant_type": "password",
+    }
+    for host in ("203.0.113.1", "203.0.113.2", "203.0.113.3"):
+        for _ in range(2):
+            response = client_from(host).post("/auth/access-token", data=data)
+            assert response.status_code == 401, response.text
+
+    # the username is out of tokens for every client, refused before hashing
+    monkeypatch.setattr(password_hasher, "max_pending", 0)
+    response = client_from("203.0.113.4").post("/auth/access-token", data=data)
+    assert response.status_code == 429, response.text
+    response = client.post("/auth/access-token", data={**data, "password": "password"})
+    assert response.status_code == 429, response.text
+
+    # other usernames are not affected
+    response = client_from("203.0.113.4").post(
+        "/auth/access-token",
+        data={**data, "username": "mahdi"},
+    )
+    assert response.status_code == 503, response.text
@@ -1,5 +1,9 @@
+import json
+
 import pytest
 
+from src.repository.repos.comment_repo import CommentRepo
+from src.web.core.cache import comment_cache
 from tests.conftest import BaseTest
 
 
@@ -310,3 +314,202 @@ def test_delete_comment(client, headers, payload):
         headers=headers,
     )
     assert response.status_code == 204, response.text
+
+
+def test_get_comments_paginated(client, headers, payload):
+    post_id = client.post("/posts", headers=headers, json=payload).json()["id"]
+    for i in range(5):
+        client.post(f"/posts/{post_id}/comment", headers=headers, json=f"c{i}")
+
+    got, params = [], {"limit": 2}
+    while True:
+        response = client.get(f"/comments/{post_id}/basecomments", params=params)
+        assert response.status_code == 200, response.text
+        assert len(response.json()) <= 2
+        got.extend(comment["comment"] for comment in response.json())
+
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["X-Next-Cursor"]
+
+    assert got == [f"c{i}" for i in range(5)]
+
+
+def test_get_comments_invalid_cursor(client, headers, payload):
+    post_id = client.post("/posts", headers=headers, json=payload).json()["id"]
+    response = client.get(
+        f"/comments/{post_id}/basecomments",
+        params={"cursor": "not-a-cursor"},
+    )
+    assert response.status_code == 400, response.text
+
+
+def test_get_comments_scoped_to_post(client, headers, payload):
+    post_id = client.post("/posts", headers=headers, json=payload).json()["id"]
+    other_post_id = client.post("/posts", headers=headers, json=payload).json()["id"]
+    client.post(f"/posts/{post_id}/comment", headers=headers, json="mine")
+    client.post(f"/posts/{other_post_id}/comment", headers=headers, json="other")
+
+    response = client.get(
+        f"/comments/{post_id}/basecomments",
+        params={"reply-level": "3"},
+    )
+    assert response.status_code == 200, response.text
+    assert [comment["comment"] for comment in response.json()] == ["mine"]
+
+
+def test_export_comments(client, headers, payload):
+    post_id = client.post("/posts", headers=headers, json=payload).json()["id"]
+    comment_id = client.post(
+        f"/posts/{post_id}/comment",
+        headers=headers,
+        json="c",
+    ).json()["id"]
+    client.post(f"/posts/{post_id}/comment/{comment_id}", headers=headers, json="r")
+    client.post(f"/posts/{post_id}/comment", headers=headers, json="c2")
+
+    response = client.get(f"/comments/{post_id}/export")
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    comments = [json.loads(line) for line in response.text.splitlines()]
+    assert [comment["comment"] for comment in comments] == ["c", "r", "c2"]
+
+
+def test_export_comments_thread_order(client, headers, payload):
+    post_id = client.post("/posts", headers=headers, json=payload).json()["id"]
+    for i in range(1, 11):
+        comment_id = client.post(
+            f"/posts/{post_id}/comment",
+            headers=headers,
+            json=f"c{i}",
+        ).json()["id"]
+    client.post(f"/posts/{post_id}/comment/{comment_id}", headers=headers, json="r")
+
+    # ids are ordered as numbers, `10` comes after `9`
+    response = client.get(f"/comments/{post_id}/export")
+    comments = [json.loads(line)["comment"] for line in response.text.splitlines()]
+    assert comments == [f"c{i}" for i in range(1, 11)] + ["r"]
+
+
+def test_export_comments_post_not_found(client):
+    response = client.get("/comments/0/export")
+    assert response.status_code == 404, response.text
+
+
+def test_delete_comment_with_replies(client, headers, headers2, payload):
+    post_id = client.post("/posts", headers=headers, json=payload).json()["id"]
+    comment_id = client.post(
+        f"/posts/{post_id}/comment",
+        headers=headers,
+        json="my comment",
+    ).json()["id"]
+    reply_id = client.post(
+        f"/posts/{post_id}/comment/{comment_id}",
+        headers=headers2,
+        json="reply",
+    ).json()["id"]
+    client.post(f"/posts/{post_id}/comment/{reply_id}", headers=headers, json="r")
+
+    # only the owner can delete the comment
+    response = client.delete(f"/comments/{post_id}/{comment_id}", headers=headers2)
+    assert response.status_code == 404, response.text
+
+    response = client.delete(f"/comments/{post_id}/{comment_id}", headers=headers)
+    assert response.status_code == 204, response.text
+
+    response = client.get(f"/comments/{post_id}/export")
+    assert response.text == ""
+
+
+def test_get_comments_cached(client, headers, payload):
+    post_id = client.post("/posts", headers=headers, json=payload).json()["id"]
+    comment_id = client.post(
+        f"/posts/{post_id}/comment",
+        headers=headers,
+        json="my comment",
+    ).json()["id"]
+
+    first = client.get(f"/comments/{post_id}/basecomments").json()
+    second = client.get(f"/comments/{post_id}/basecomments").json()
+    assert first == second
+
+    metrics = client.get("/metrics/caches").json()["comments"]
+    assert metrics["hits"] >= 1
+    assert metrics["size"] >= 1
+
+    # a cached page answers conditional requests too
+    etag = client.get(f"/comments/{post_id}/basecomments").headers["ETag"]
+    response = client.get(
+        f"/comments/{post_id}/basecomments",
+        headers={"If-None-Match": etag},
+    )
+    assert response.status_code == 304, response.text
+    hits = client.get("/metrics/caches").json()["comments"]["hits"]
+    assert hits >= metrics["hits"] + 2
+
+    # writes drop the cached pages of the post
+    client.post(f"/posts/{post_id}/comment/{comment_id}", headers=headers, json="r")
+    comments = client.get(f"/comments/{post_id}/basecomments").json()
+    assert comments[0]["reply_count"] == 1
+
+    client.put(f"/comments/{post_id}/{comment_id}", headers=headers, json="edited")
+    comments = client.get(f"/comments/{post_id}/basecomments").json()
+    assert comments[0]["comment"] == "edited"
+
+    client.delete(f"/comments/{post_id}/{comment_id}", headers=headers)
+    assert client.get(f"/comments/{post_id}/basecomments").json() == []
+
+    client.delete(f"/posts/{post_id}", headers=headers)
+    response = client.get(f"/comments/{post_id}/basecomments")
+    assert response.status_code == 404, response.text
+
+
+def test_get_comments_not_modified_without_reading(
+    client,
+    headers,
+    payload,
+    monkeypatch,
+):
+    post_id = client.post("/posts", headers=headers, json=payload).json()["id"]
+    client.post(f"/posts/{post_id}/comment", headers=headers, json="c")
+    etag = client.get(f"/comments/{post_id}/basecomments").headers["ETag"]
+    comment_cache.clear()
+
+    # a conditional request which misses the cache is answered from the
+    # version of the comments, without reading the page
+    async def no_list(*args, **kwargs):
+        raise AssertionError("the page was read")
+
+    monkeypatch.setattr(CommentRepo, "list", no_list)
+    response = client.get(
+        f"/comments/{post_id}/basecomments",
+        headers={"If-None-Match": etag},
+    )
+    assert response.status_code == 304, response.text
+
+
+def test_get_comments_conditional(client, headers, payload):
+    post_id = client.post("/posts", headers=headers, json=payload).json()["id"]
+    comment_id = client.post(
+        f"/posts/{post_id}/comment",
+        headers=headers,
+        json="my comment",
+    ).json()["id"]
+
+    response = client.get(f"/comments/{post_id}/basecomments")
+    etag = response.headers["ETag"]
+    response = client.get(
+        f"/comments/{post_id}/basecomments",
+        headers={"If-None-Match": etag},
+    )
+    assert response.status_code == 304, response.text
+
+    # any change to the comments of the post changes the tag
+    client.put(f"/comments/{post_id}/{comment_id}", headers=headers, json="edited")
+    response = client.get(
+        f"/comments/{post_id}/{comment_id}",
+        headers={"If-None-Match": etag},
+    )
+    assert response.status_code == 200, response.text
+    assert response.headers["ETag"] != etag
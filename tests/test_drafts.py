@@ -50,6 +50,12 @@ class TestPostDraft(BaseTest):
         assert body == self.body
 
         response = client.get("/drafts", headers=headers)
+        draft = response.json()[0]
+        assert draft["title"] == self.title
+        assert draft["excerpt"] == self.body
+        assert "body" not in draft
+
+        response = client.get("/drafts", params={"include": "body"}, headers=headers)
         title, body = self.extract(response.json()[0])
         assert title == self.title
         assert body == self.body
@@ -165,6 +171,9 @@ class TestGetDraft(BaseTest):
         ).json()
 
         posts = [post1, post2, post3, post4, post5, post6, post7, post8, post9, post10]
+        # the lists show the excerpts instead of the bodies
+        for post in posts:
+            del post["body"]
 
         # default query params:
         # page = 1,
@@ -266,3 +275,35 @@ def test_delete_draft(client, headers, payload):
     assert response.status_code == 204, response.text
     assert not client.get("/posts", headers=headers).json()
     assert client.get(f"/posts{draft_id}").status_code == 404
+
+
+def test_get_drafts_by_cursor(client, headers):
+    titles = [str(i) for i in range(7)]
+    for title in titles:
+        client.post("/drafts", json={"title": title, "body": "b"}, headers=headers)
+
+    got, params = [], {"per-page": 3}
+    while True:
+        response = client.get("/drafts", params=params, headers=headers)
+        assert response.status_code == 200, response.text
+        got.extend(draft["title"] for draft in response.json())
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["X-Next-Cursor"]
+    assert got == titles[::-1]
+
+
+def test_get_draft_conditional(client, headers):
+    draft_id = client.post(
+        "/drafts",
+        json={"title": "title", "body": "body"},
+        headers=headers,
+    ).json()["id"]
+
+    response = client.get(f"/drafts/{draft_id}", headers=headers)
+    etag = response.headers["ETag"]
+    response = client.get(
+        f"/drafts/{draft_id}",
+        headers={**headers, "If-None-Match": etag},
+    )
+    assert response.status_code == 304, response.text
@@ -1,3 +1,11 @@
+import time
+
+import pytest
+
+from src.service.post_service import PostService
+from src.web.core.cache import post_page_cache
+
+
 def test_get_global_post(client, payload, headers):
     post = client.post("/posts", json=payload, headers=headers).json()
 
@@ -53,3 +61,126 @@ def test_get_global_post(client, payload, headers):
     assert post["all_comments_count"] == 8
     assert post["base_comments_count"] == 3
     assert post["reply_comments_count"] == 5
+
+
+def test_get_global_post_after_deleting_comments(client, payload, headers):
+    post = client.post("/posts", json=payload, headers=headers).json()
+
+    # |- 1
+    #    |- 1.1
+    #       |- 1.1.1
+    # |- 2
+    one_id = client.post(
+        f'/posts/{post["id"]}/comment',
+        headers=headers,
+        json="1",
+    ).json()["id"]
+    one_one_id = client.post(
+        f'/posts/{post["id"]}/comment/{one_id}',
+        headers=headers,
+        json="1.1",
+    ).json()["id"]
+    client.post(
+        f'/posts/{post["id"]}/comment/{one_one_id}',
+        headers=headers,
+        json="1.1.1",
+    )
+    client.post(f'/posts/{post["id"]}/comment', headers=headers, json="2")
+
+    client.delete(f'/comments/{post["id"]}/{one_one_id}', headers=headers)
+    post_data = client.get(post["url"]).json()
+    assert post_data["all_comments_count"] == 2
+    assert post_data["base_comments_count"] == 2
+    assert post_data["reply_comments_count"] == 0
+
+    client.delete(f'/comments/{post["id"]}/{one_id}', headers=headers)
+    post_data = client.get(post["url"]).json()
+    assert post_data["all_comments_count"] == 1
+    assert post_data["base_comments_count"] == 1
+    assert post_data["reply_comments_count"] == 0
+
+
+def test_get_global_post_after_updating_url(client, payload, headers):
+    post = client.post("/posts", json=payload, headers=headers).json()
+
+    response = client.get(post["url"])
+    assert response.status_code == 200, response.text
+    response = client.get(post["url"])
+    assert response.status_code == 200, response.text
+    assert client.get("/metrics/caches").json()["post_pages"]["hits"] >= 1
+
+    new_url = client.patch(
+        f'/posts/{post["id"]}',
+        json={"title_in_url": "new title"},
+        headers=headers,
+    ).json()["url"]
+    response = client.get(post["url"])
+    assert response.status_code == 404, response.text
+    response = client.get(new_url)
+    assert response.status_code == 200, response.text
+
+    client.delete(f'/posts/{post["id"]}', headers=headers)
+    response = client.get(new_url)
+    assert response.status_code == 404, response.text
+
+
+def test_get_global_post_conditional(client, payload, headers):
+    post = client.post("/posts", json=payload, headers=headers).json()
+
+    etag = client.get(post["url"]).headers["ETag"]
+    response = client.get(post["url"], headers={"If-None-Match": etag})
+    assert response.status_code == 304, response.text
+
+    # the comment counters are part of the public view
+    client.post(f'/posts/{post["id"]}/comment', headers=headers, json="1")
+    response = client.get(post["url"], headers={"If-None-Match": etag})
+    assert response.status_code == 200, response.text
+
+    # and so is the time they last changed
+    last_modified = response.headers["Last-Modified"]
+    time.sleep(1)  # Last-Modified has a resolution of a second
+    client.post(f'/posts/{post["id"]}/comment', headers=headers, json="2")
+    response = client.get(post["url"], headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 200, response.text
+    assert response.json()["all_comments_count"] == 2
+
+
+def test_get_global_post_cached(client, payload, headers):
+    post = client.post("/posts", json=payload, headers=headers).json()
+
+    first = client.get(post["url"])
+    second = client.get(post["url"])
+    assert first.content == second.content
+    assert client.get("/metrics/caches").json()["post_pages"]["hits"] >= 1
+
+    # the domain comes from the request, but does not key the cache
+    response = client.get(post["url"], headers={"Host": "example.org"})
+    assert response.json()["url"].startswith("http://example.org/@string/")
+    assert client.get("/metrics/caches").json()["post_pages"]["size"] == 1
+
+    # the cached page is purged when the comments or the post change
+    client.post(f'/posts/{post["id"]}/comment', headers=headers, json="1")
+    assert client.get(post["url"]).json()["all_comments_count"] == 1
+
+    client.patch(f'/posts/{post["id"]}', json={"title": "new"}, headers=headers)
+    assert client.get(post["url"]).json()["title"] == "new"
+
+    client.delete(f'/posts/{post["id"]}', headers=headers)
+    response = client.get(post["url"])
+    assert response.status_code == 404, response.text
+
+
+def test_get_global_post_not_cached_after_invalidation(client, payload, headers):
+    post = client.post("/posts", json=payload, headers=headers).json()
+    read = PostService.get_post_by_post_url
+
+    async def read_then_change(self, username, post_slug):
+        page = await read(self, username, post_slug)
+        # a change committed while the page was read
+        post_page_cache.invalidate(page["id"])
+        return page
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(PostService, "get_post_by_post_url", read_then_change)
+        assert client.get(post["url"]).status_code == 200
+    assert client.get("/metrics/caches").json()["post_pages"]["size"] == 0
@@ -1,3 +1,9 @@
+import json
+from datetime import datetime
+
+from src.common import utils
+
+
 class BaseTest:
     @classmethod
     def setup_class(cls):
@@ -284,3 +290,136 @@ def test_delete_post(client, headers, payload):
     response = client.delete(f"posts/{post_id}", headers=headers)
     assert response.status_code == 204, response.text
     assert client.get(f"/posts{post_id}").status_code == 404
+
+
+def test_get_posts_by_cursor(client, headers):
+    titles = [str(i) for i in range(7)]
+    for title in titles:
+        client.post(
+            "/posts",
+            json={"title": title, "body": "b", "tags": ["1"]},
+            headers=headers,
+        )
+
+    for sort, expected in (("date", titles[::-1]), ("title", sorted(titles))):
+        got, params = [], {"per-page": 3, "sort": sort}
+        if sort == "title":
+            params["desc"] = "false"
+        while True:
+            response = client.get("/posts", params=params, headers=headers)
+            assert response.status_code == 200, response.text
+            got.extend(post["title"] for post in response.json())
+            if "X-Next-Cursor" not in response.headers:
+                break
+            params["cursor"] = response.headers["X-Next-Cursor"]
+        assert got == expected
+
+    response = client.get("/posts", params={"cursor": "!"}, headers=headers)
+    assert response.status_code == 400, response.text
+
+
+def test_get_post_conditional(client, headers, payload):
+    post_id = client.post("/posts", json=payload, headers=headers).json()["id"]
+
+    response = client.get(f"/posts/{post_id}", headers=headers)
+    etag, last_modified = response.headers["ETag"], response.headers["Last-Modified"]
+
+    response = client.get(
+        f"/posts/{post_id}",
+        headers={**headers, "If-None-Match": etag},
+    )
+    assert response.status_code == 304, response.text
+    assert response.headers["ETag"] == etag
+
+    response = client.get(
+        f"/posts/{post_id}",
+        headers={**headers, "If-Modified-Since": last_modified},
+    )
+    assert response.status_code == 304, response.text
+
+    # a `-0000` zone is a valid HTTP date too
+    response = client.get(
+        f"/posts/{post_id}",
+        headers={
+            **headers,
+            "If-Modified-Since": last_modified.replace("GMT", "-0000"),
+        },
+    )
+    assert response.status_code == 304, response.text
+
+    client.patch(f"/posts/{post_id}", json={"body": "new body"}, headers=headers)
+    response = client.get(
+        f"/posts/{post_id}",
+        headers={**headers, "If-None-Match": etag},
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["body"] == "new body"
+
+
+def test_create_posts_bulk(client, headers, payload):
+    posts = [
+        {**payload, "title": "first", "tags": ["python", "bulk"]},
+        {"title": "no body", "tags": ["python"]},
+        {**payload, "title": "second", "tags": ["bulk"]},
+    ]
+    response = client.post("/posts/bulk", json=posts, headers=headers)
+    assert response.status_code == 201, response.text
+    result = response.json()
+    assert len(result["created"]) == 2
+    assert [error["index"] for error in result["errors"]] == [1]
+
+    first, second = (
+        client.get(f"/posts/{post_id}", headers=headers).json()
+        for post_id in result["created"]
+    )
+    assert (first["title"], set(first["tags"])) == ("first", {"python", "bulk"})
+    assert (second["title"], second["tags"]) == ("second", ["bulk"])
+
+    ndjson = "\n".join(json.dumps({**payload, "title": str(i)}) for i in range(3))
+    response = client.post(
+        "/posts/bulk",
+        content=f"{ndjson}\nnot json\n",
+        headers={**headers, "Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 201, response.text
+    assert len(response.json()["created"]) == 3
+    assert response.json()["errors"] == [{"index": 3, "detail": "invalid JSON"}]
+
+    response = client.post("/posts/bulk", json=payload, headers=headers)
+    assert response.status_code == 422, response.text
+
+
+def test_get_posts_excerpts(client, headers, payload):
+    body = "Lorem  ipsum\n\ndolor " * 100
+    client.post("/posts", json={**payload, "body": body}, headers=headers)
+
+    post = client.get("/posts", headers=headers).json()[0]
+    assert "body" not in post
+    assert post["excerpt"] == " ".join(body.split())[:280]
+
+    response = client.get("/posts", params={"include": "body"}, headers=headers)
+    assert response.json()[0]["body"] == body.strip()
+
+    post = client.get(f"/posts/{post['id']}", headers=headers).json()
+    assert post["body"] == body.strip()
+
+    response = client.patch(
+        f"/posts/{post['id']}",
+        json={"body": "short"},
+        headers=headers,
+    )
+    assert response.json()["excerpt"] == "short"
+    assert client.get("/posts", headers=headers).json()[0]["excerpt"] == "short"
+
+
+def test_create_posts_same_title_same_time(client, headers, payload, monkeypatch):
+    class FrozenDatetime(datetime):
+        @classmethod
+        def utcnow(cls):
+            return cls(2023, 9, 1)
+
+    monkeypatch.setattr(utils, "datetime", FrozenDatetime)
+    first = client.post("/posts", json=payload, headers=headers)
+    second = client.post("/posts", json=payload, headers=headers)
+    assert second.status_code == 201, second.text
+    assert first.json()["url"] != second.json()["url"]
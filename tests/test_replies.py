@@ -273,3 +273,116 @@ class TestGetCommentsBaseCommentsWithThreeLevelReply(BaseTest):
                     for two_level in got_replies
                     if (two_level["path"].split(".")) == 4
                 )
+
+
+def test_reply_counters(client, headers, payload):
+    # |- c
+    #    |- r1
+    #       |- r1.1
+    #    |- r2
+    post_id = client.post("/posts", headers=headers, json=payload).json()["id"]
+    comment_id = client.post(
+        f"/posts/{post_id}/comment",
+        headers=headers,
+        json="c",
+    ).json()["id"]
+    r1_id = client.post(
+        f"/posts/{post_id}/comment/{comment_id}",
+        headers=headers,
+        json="r1",
+    ).json()["id"]
+    client.post(f"/posts/{post_id}/comment/{r1_id}", headers=headers, json="r1.1")
+    client.post(f"/posts/{post_id}/comment/{comment_id}", headers=headers, json="r2")
+
+    comment = client.get(f"/comments/{post_id}/basecomments").json()[0]
+    assert comment["reply_count"] == 3
+    assert comment["children_count"] == 2
+
+    response = client.delete(f"/comments/{post_id}/{r1_id}", headers=headers)
+    assert response.status_code == 204, response.text
+
+    comment = client.get(f"/comments/{post_id}/basecomments").json()[0]
+    assert comment["reply_count"] == 1
+    assert comment["children_count"] == 1
+
+
+def test_get_comments_tree_shape(client, headers, payload):
+    # |- c1
+    #    |- r1
+    #       |- r1.1
+    # |- c2
+    post_id = client.post("/posts", headers=headers, json=payload).json()["id"]
+    c1_id = client.post(
+        f"/posts/{post_id}/comment",
+        headers=headers,
+        json="c1",
+    ).json()["id"]
+    r1_id = client.post(
+        f"/posts/{post_id}/comment/{c1_id}",
+        headers=headers,
+        json="r1",
+    ).json()["id"]
+    client.post(f"/posts/{post_id}/comment/{r1_id}", headers=headers, json="r1.1")
+    client.post(f"/posts/{post_id}/comment", headers=headers, json="c2")
+
+    response = client.get(
+        f"/comments/{post_id}/basecomments",
+        params={"reply-level": "2", "shape": "tree"},
+    )
+    assert response.status_code == 200, response.text
+
+    c1, c2 = response.json()
+    assert c1["comment"] == "c1"
+    assert [r["comment"] for r in c1["children"]] == ["r1"]
+    assert [r["comment"] for r in c1["children"][0]["children"]] == ["r1.1"]
+    assert c1["children"][0]["children"][0]["children"] == []
+    assert c2["comment"] == "c2"
+    assert c2["children"] == []
+
+    flat = client.get(f"/comments/{post_id}/basecomments").json()
+    assert all("children" not in comment for comment in flat)
+
+
+def test_get_comments_preview(client, headers, payload):
+    # |- c
+    #    |- r1
+    #       |- r1.1
+    #       |- r1.2
+    #    |- r2
+    #    |- r3
+    post_id = client.post("/posts", headers=headers, json=payload).json()["id"]
+    c_id = client.post(
+        f"/posts/{post_id}/comment",
+        headers=headers,
+        json="c",
+    ).json()["id"]
+    r1_id = client.post(
+        f"/posts/{post_id}/comment/{c_id}",
+        headers=headers,
+        json="r1",
+    ).json()["id"]
+    client.post(f"/posts/{post_id}/comment/{r1_id}", headers=headers, json="r1.1")
+    client.post(f"/posts/{post_id}/comment/{r1_id}", headers=headers, json="r1.2")
+    client.post(f"/posts/{post_id}/comment/{c_id}", headers=headers, json="r2")
+    client.post(f"/posts/{post_id}/comment/{c_id}", headers=headers, json="r3")
+
+    response = client.get(
+        f"/comments/{post_id}/basecomments",
+        params={"depth": 1, "per-node": 2},
+    )
+    assert response.status_code == 200, response.text
+
+    comments = response.json()
+    assert [c["comment"] for c in comments] == ["c", "r1", "r2"]
+    assert [c["remaining_children"] for c in comments] == [1, 2, 0]
+
+    response = client.get(
+        f"/comments/{post_id}/{c_id}",
+        params={"depth": 1, "per-node": 1, "shape": "tree"},
+    )
+    assert response.status_code == 200, response.text
+
+    r1, r2, r3 = response.json()
+    assert [r["comment"] for r in r1["children"]] == ["r1.1"]
+    assert r1["remaining_children"] == 1
+    assert r2["children"] == r3["children"] == []
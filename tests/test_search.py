@@ -0,0 +1,56 @@
+def test_search_posts(client, headers, headers2):
+    client.post(
+        "/posts",
+        json={"title": "Python 3.12", "body": "a release of python", "tags": ["1"]},
+        headers=headers,
+    )
+    client.post(
+        "/posts",
+        json={"title": "Rust", "body": "rust can call python code", "tags": ["1"]},
+        headers=headers2,
+    )
+    client.post(
+        "/posts",
+        json={"title": "Go", "body": "nothing to see here", "tags": ["1"]},
+        headers=headers,
+    )
+
+    response = client.get("/search", params={"q": "python"})
+    assert response.status_code == 200, response.text
+    results = response.json()
+    # a match in the title ranks higher than one in the body
+    assert [result["title"] for result in results] == ["Python 3.12", "Rust"]
+    assert "<b>python</b>" in results[1]["snippet"]
+    assert results[0]["url"].startswith("http://testserver/@string/")
+
+    response = client.get("/search", params={"q": "python", "limit": 1})
+    assert [result["title"] for result in response.json()] == ["Python 3.12"]
+    cursor = response.headers["X-Next-Cursor"]
+
+    response = client.get(
+        "/search",
+        params={"q": "python", "limit": 1, "cursor": cursor},
+    )
+    assert [result["title"] for result in response.json()] == ["Rust"]
+    assert "X-Next-Cursor" not in response.headers
+
+    response = client.get("/search", params={"q": "python -rust"})
+    assert [result["title"] for result in response.json()] == ["Python 3.12"]
+
+    client.post(
+        "/posts",
+        json={
+            "title": "XSS",
+            "body": 'python <script>alert("x")</script> & more',
+            "tags": ["1"],
+        },
+        headers=headers,
+    )
+    response = client.get("/search", params={"q": "python -rust -release"})
+    # the snippets are HTML, so markup from the body comes back escaped
+    assert response.json()[0]["snippet"] == (
+        "<b>python</b> &lt;script&gt;alert(&quot;x&quot;)&lt;/script&gt; &amp; more"
+    )
+
+    response = client.get("/search", params={"q": ""})
+    assert response.status_code == 422, response.text
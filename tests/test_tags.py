@@ -0,0 +1,42 @@
+def test_get_tagged_posts(client, headers, headers2):
+    for i, tags in enumerate((["python"], ["python", "web"], ["web"])):
+        client.post(
+            "/posts",
+            json={"title": f"p{i}", "body": "b", "tags": tags},
+            headers=headers if i % 2 else headers2,
+        )
+
+    response = client.get("/tags/python/posts")
+    assert response.status_code == 200, response.text
+    assert [post["title"] for post in response.json()] == ["p1", "p0"]
+    assert "X-Next-Cursor" not in response.headers
+
+    response = client.get("/tags/Python/posts", params={"limit": 1})
+    assert [post["title"] for post in response.json()] == ["p1"]
+    cursor = response.headers["X-Next-Cursor"]
+
+    response = client.get("/tags/python/posts", params={"limit": 1, "cursor": cursor})
+    assert [post["title"] for post in response.json()] == ["p0"]
+    assert "X-Next-Cursor" not in response.headers
+
+    response = client.get("/tags/nothing/posts")
+    assert response.status_code == 200, response.text
+    assert response.json() == []
+
+
+def test_get_posts_by_tags(client, headers):
+    for i, tags in enumerate((["python"], ["python", "web"], ["web"])):
+        client.post(
+            "/posts",
+            json={"title": f"p{i}", "body": "b", "tags": tags},
+            headers=headers,
+        )
+
+    def titles(**params):
+        response = client.get("/posts", params=params, headers=headers)
+        assert response.status_code == 200, response.text
+        return [post["title"] for post in response.json()]
+
+    assert titles(tag="python") == ["p1", "p0"]
+    assert titles(tag=["python", "web"]) == ["p1"]
+    assert titles(tag=["python", "web"], match="any") == ["p2", "p1", "p0"]
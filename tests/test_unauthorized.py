@@ -3,6 +3,9 @@ class TestNotAuthorized:
         response = class_client.get("/users/me")
         assert response.status_code == 401, response.text
 
+        response = class_client.get("/users/me/export")
+        assert response.status_code == 401, response.text
+
     def test_not_authorized_posts(self, class_client, payload):
         response = class_client.get("/posts")
         assert response.status_code == 401, response.text
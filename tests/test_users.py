@@ -1,3 +1,6 @@
+import json
+
+
 class TestUsers:
     name = "mahdi"
     username = "string"
@@ -238,3 +241,63 @@ class TestUsers:
         title, created = self.extract_draft(drafts[0])
         assert title == payload["title"]
         assert created is not None
+
+
+def test_users_me_export(client, headers, headers2, payload):
+    for title in ("first", "second"):
+        client.post(
+            "/posts",
+            headers=headers,
+            json={**payload, "title": title, "tags": ["c", "a", "b"]},
+        )
+    client.post("/drafts", headers=headers, json=payload)
+    client.post("/posts", headers=headers2, json=payload)
+
+    response = client.get("/users/me/export", headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"] == "application/x-ndjson"
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["type"] for line in lines] == ["post", "post", "draft"]
+    assert [line["title"] for line in lines[:2]] == ["first", "second"]
+    assert lines[0]["tags"] == ["a", "b", "c"]
+    assert lines[0]["url"].startswith("http://testserver/@string/first")
+    assert lines[2]["body"] == payload["body"]
+
+
+def test_users_me_pages(client, headers):
+    for i in range(5):
+        client.post(
+            "/posts",
+            headers=headers,
+            json={"title": f"p{i}", "body": "b", "tags": ["1"]},
+        )
+    for i in range(3):
+        client.post("/drafts", headers=headers, json={"title": f"d{i}", "body": "b"})
+
+    response = client.get("/users/me", params={"limit": 2}, headers=headers)
+    assert response.status_code == 200, response.text
+    user = response.json()
+    assert [post["title"] for post in user["posts"]] == ["p4", "p3"]
+    assert [draft["title"] for draft in user["drafts"]] == ["d2", "d1"]
+    assert user["posts"][0]["url"].startswith("http://testserver/@string/p4")
+
+    posts, params = [], {"limit": 2}
+    while True:
+        response = client.get("/users/me", params=params, headers=headers)
+        posts += [post["title"] for post in response.json()["posts"]]
+        params["posts-cursor"] = response.headers.get("X-Next-Posts-Cursor")
+        if params["posts-cursor"] is None:
+            break
+    assert posts == ["p4", "p3", "p2", "p1", "p0"]
+
+    response = client.get(
+        "/users/me",
+        params={"limit": 2, "drafts-cursor": response.headers["X-Next-Drafts-Cursor"]},
+        headers=headers,
+    )
+    assert [draft["title"] for draft in response.json()["drafts"]] == ["d0"]
+    assert "X-Next-Drafts-Cursor" not in response.headers
+
+    response = client.get("/users/me", params={"posts-cursor": "!"}, headers=headers)
+    assert response.status_code == 400, response.text